@@ -1,5 +1,6 @@
-import json
-import aiosqlite
+import html
+from typing import Tuple
+
 from aiogram import F, Router
 from aiogram.exceptions import TelegramBadRequest
 from aiogram.fsm.context import FSMContext
@@ -12,12 +13,24 @@ from aiogram.types import (
     ContentType, InputFile, FSInputFile,
 )
 from aiogram.filters import Command
-
-from database.cards import cards_data, reset_cooldown
+from aiogram.utils.keyboard import InlineKeyboardBuilder
+from cachetools import LRUCache
+
+import config
+from backup import backup_scheduler
+from broadcast import broadcaster
+from database.cards import reset_cooldown
+from database.catalog import catalog
+from database.leaderboard import leaderboard
 from database.mailing import get_stats
+from middlewares.throttling_middlewares import throttling
 
 ADMIN_ID = []
 
+# фильтр «все редкости» в списке карточек
+ALL_RARITIES = "all"
+_cards_pages = LRUCache(maxsize=config.ADMIN_CARDS_CACHE_SIZE)
+
 admin_router = Router()
 
 
@@ -94,35 +107,9 @@ async def process_broadcast_message(message: Message, state: FSMContext):
     broadcast_text = message.text
     await state.clear()
 
-    await message.answer("🚀 Начинаю рассылку по чатам...", reply_markup=get_admin_keyboard())
-
-    async with aiosqlite.connect("database.db") as db:
-        cursor = await db.execute("SELECT DISTINCT chat_id FROM chat_users WHERE chat_id IS NOT NULL")
-        rows = await cursor.fetchall()
-        chat_ids = [row[0] for row in rows]
-
-    success_count = 0
-    failure_count = 0
-
-    for chat_id in chat_ids:
-        try:
-            await message.bot.send_message(
-                chat_id=chat_id,
-                text=broadcast_text,
-                parse_mode='HTML',
-                disable_web_page_preview=True
-            )
-            success_count += 1
-        except Exception as e:
-            print(f"Не удалось отправить сообщение в чат {chat_id}: {e}")
-            failure_count += 1
-
-    await message.answer(
-        f"✅ **Рассылка завершена.**\n\n"
-        f"🎯 Успешно: {success_count}\n"
-        f"⚠️ Не удалось: {failure_count}",
-        parse_mode='Markdown'
-    )
+    progress_message = await message.answer("🚀 Начинаю рассылку по чатам...")
+    await broadcaster.create(message.bot, broadcast_text, message.chat.id, progress_message.message_id)
+    await message.answer("🎛️ **Админ-панель:**", reply_markup=get_admin_keyboard(), parse_mode='Markdown')
 
 
 @admin_router.callback_query(F.data == "show_stats")
@@ -132,7 +119,9 @@ async def show_stats(callback_query: CallbackQuery):
     stats_message = (
         f"📊 **Статистика:**\n\n"
         f"👤 Личных пользователей: **{users_count}**\n"
-        f"💬 Чатов: **{chats_count}**"
+        f"💬 Чатов: **{chats_count}**\n\n"
+        f"🏆 Кэш топов: попаданий **{leaderboard.hits}**, промахов **{leaderboard.misses}**\n"
+        f"🚦 Антифлуд: пропущено **{throttling.passed}**, отброшено **{sum(throttling.dropped.values())}**"
     )
     await callback_query.message.edit_text(stats_message, parse_mode='Markdown', reply_markup=get_admin_keyboard())
     await callback_query.answer()
@@ -149,31 +138,95 @@ async def add_card(callback_query: CallbackQuery, state: FSMContext):
     await callback_query.answer()
 
 
+def _render_cards_page(rarity: str, page: int) -> Tuple[str, InlineKeyboardMarkup]:
+    # страница зависит только от снимка каталога, поэтому рендерится один раз
+    # на версию; ключи старых версий вытесняются из LRU сами
+    snapshot = catalog.snapshot
+    key = (snapshot.version, rarity, page)
+    rendered = _cards_pages.get(key)
+    if rendered is not None:
+        return rendered
+
+    cards = snapshot.cards if rarity == ALL_RARITIES else snapshot.by_rarity.get(rarity, ())
+    page_size = config.ADMIN_CARDS_PAGE_SIZE
+    pages = max(1, (len(cards) + page_size - 1) // page_size)
+    page = min(max(page, 0), pages - 1)
+
+    # имена вводит админ, поэтому страница в HTML с экранированием:
+    # «_» или «*» в имени ломали бы Markdown
+    title = "все" if rarity == ALL_RARITIES else html.escape(rarity)
+    lines = [f"📜 <b>Список карточек ({title}): {len(cards)}</b>\n"]
+    for card in cards[page * page_size:(page + 1) * page_size]:
+        lines.append(
+            f"• <b>{html.escape(str(card['name']))}</b>\n"
+            f"  ID: {card['id']}\n"
+            f"  Редкость: {html.escape(card.get('rarity', 'Неизвестно'))}"
+        )
+    if not cards:
+        lines.append("❌ Нет добавленных карточек.")
+
+    builder = InlineKeyboardBuilder()
+    navigation = []
+    if page > 0:
+        navigation.append(InlineKeyboardButton(text="⬅️", callback_data=f"admin_cards:{rarity}:{page - 1}"))
+    navigation.append(InlineKeyboardButton(text=f"{page + 1}/{pages}", callback_data="admin_cards_noop"))
+    if page < pages - 1:
+        navigation.append(InlineKeyboardButton(text="➡️", callback_data=f"admin_cards:{rarity}:{page + 1}"))
+    builder.row(*navigation)
+    filters = [(ALL_RARITIES, "Все")] + [(name, f"{info['emoji']} {name}") for name, info in config.RARITIES.items()]
+    builder.row(*[
+        InlineKeyboardButton(text=f"• {label}" if name == rarity else label, callback_data=f"admin_cards:{name}:0")
+        for name, label in filters
+    ], width=3)
+    builder.row(InlineKeyboardButton(text="🔙 Админ-панель", callback_data="admin_menu"))
+
+    rendered = ("\n".join(lines), builder.as_markup())
+    _cards_pages[key] = rendered
+    return rendered
+
+
+async def _show_cards_page(callback_query: CallbackQuery, rarity: str, page: int):
+    text, keyboard = _render_cards_page(rarity, page)
+    try:
+        await callback_query.message.edit_text(text, parse_mode='HTML', reply_markup=keyboard)
+    except TelegramBadRequest as e:
+        # повторное нажатие на ту же страницу — не ошибка
+        if "message is not modified" not in e.message:
+            print(f"Не удалось показать список карточек: {e}")
+            await callback_query.answer("❌ Не удалось показать страницу.", show_alert=True)
+            return
+    await callback_query.answer()
+
+
 @admin_router.callback_query(F.data == "show_cards")
 async def show_cards(callback_query: CallbackQuery):
-    if not cards_data.get("cards"):
-        await callback_query.message.edit_text("❌ Нет добавленных карточек.", reply_markup=get_admin_keyboard())
-    else:
-        text = "📜 **Список карточек:**\n\n"
-        for card in cards_data["cards"]:
-            media_type = card.get("media_type", "photo")
-            rarity = card.get("rarity", "Неизвестно")
-            text += (
-                f"• **{card['name']}**\n"
-                f"  ID: {card['id']}\n"
-                f"  Редкость: {rarity}\n"
-            )
-        await callback_query.message.edit_text(text, parse_mode='Markdown', reply_markup=get_admin_keyboard())
+    await _show_cards_page(callback_query, ALL_RARITIES, 0)
+
+
+@admin_router.callback_query(F.data.startswith("admin_cards:"))
+async def show_cards_page(callback_query: CallbackQuery):
+    _, rarity, page = callback_query.data.split(":")
+    await _show_cards_page(callback_query, rarity, int(page))
+
+
+@admin_router.callback_query(F.data == "admin_cards_noop")
+async def cards_page_noop(callback_query: CallbackQuery):
+    await callback_query.answer()
+
+
+@admin_router.callback_query(F.data == "admin_menu")
+async def back_to_admin_panel(callback_query: CallbackQuery):
+    await callback_query.message.edit_text("🎛️ **Админ-панель:**", reply_markup=get_admin_keyboard(), parse_mode='Markdown')
     await callback_query.answer()
 
 
 @admin_router.callback_query(F.data == "backup_db")
 async def backup_db(callback_query: CallbackQuery):
     try:
-        db_file = FSInputFile("database.db")
+        backup_path = await backup_scheduler.create()
         await callback_query.bot.send_document(
             chat_id=callback_query.message.chat.id,
-            document=db_file,
+            document=FSInputFile(backup_path),
             caption="📦 *Резервная копия базы данных.*",
             parse_mode="MarkDown"
         )
@@ -234,23 +287,8 @@ async def process_photo(message: Message, state: FSMContext):
     await state.update_data(file_id=file_id, media_type=media_type)
     data = await state.get_data()
 
-    if cards_data.get("cards"):
-        max_id = max(int(card["id"]) for card in cards_data["cards"] if card["id"].isdigit())
-        new_id = str(max_id + 1)
-    else:
-        new_id = '1'
-
-    card = {
-        "name": data["name"],
-        "id": new_id,
-        "rarity": data["rarity"],
-        "file_id": data["file_id"],
-        "media_type": data["media_type"]
-    }
-    cards_data["cards"].append(card)
-
-    with open('cards.json', 'w', encoding='utf-8') as f:
-        json.dump(cards_data, f, ensure_ascii=False, indent=4)
+    card = await catalog.add(data["name"], data["rarity"], data["file_id"], data["media_type"])
+    new_id = card["id"]
 
     await message.answer(
         f"✅ **Карточка успешно добавлена!**\n\n"
@@ -0,0 +1,87 @@
+import asyncio
+import heapq
+import time
+from collections import defaultdict
+from typing import List, Optional
+
+from aiogram import Bot
+
+from database.autodelete import add_pending_deletion, get_pending_deletions, remove_pending_deletions
+
+# Telegram принимает не больше 100 сообщений в одном deleteMessages
+DELETE_BATCH_SIZE = 100
+
+
+class DeletionScheduler:
+    def __init__(self):
+        self._heap = []
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+        self._bot: Optional[Bot] = None
+        self._shard: Optional[int] = None
+
+    async def start(self, bot: Bot, shard: Optional[int] = None, workers: int = 1):
+        self._bot = bot
+        self._shard = shard
+        # отложенные удаления переживают перезапуск: поднимаем их из базы;
+        # при нескольких воркерах каждый поднимает только свои, иначе удаления задвоятся
+        for row_id, chat_id, message_ids, due_at in await get_pending_deletions(shard, workers):
+            heapq.heappush(self._heap, (due_at, row_id, chat_id, message_ids))
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def schedule(self, chat_id: int, message_ids: List[int], delay: float):
+        due_at = time.time() + delay
+        row_id = await add_pending_deletion(chat_id, message_ids, due_at, self._shard or 0)
+        heapq.heappush(self._heap, (due_at, row_id, chat_id, message_ids))
+        self._wakeup.set()
+
+    async def _run(self):
+        while True:
+            self._wakeup.clear()
+            if not self._heap:
+                await self._wakeup.wait()
+                continue
+
+            delay = self._heap[0][0] - time.time()
+            if delay > 0:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            now = time.time()
+            batch = []
+            while self._heap and self._heap[0][0] <= now:
+                batch.append(heapq.heappop(self._heap))
+            try:
+                await self._delete_batch(batch)
+            except Exception as e:
+                print(f"Ошибка при автоудалении: {e}")
+
+    async def _delete_batch(self, batch):
+        messages_by_chat = defaultdict(list)
+        for _, _, chat_id, message_ids in batch:
+            messages_by_chat[chat_id].extend(message_ids)
+
+        for chat_id, message_ids in messages_by_chat.items():
+            for start in range(0, len(message_ids), DELETE_BATCH_SIZE):
+                try:
+                    await self._bot.delete_messages(chat_id, message_ids[start:start + DELETE_BATCH_SIZE])
+                except Exception as e:
+                    print(f"Ошибка при автоудалении: {e}")
+
+        await remove_pending_deletions([row_id for _, row_id, _, _ in batch])
+
+
+deletion_scheduler = DeletionScheduler()
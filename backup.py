@@ -0,0 +1,98 @@
+import asyncio
+import datetime
+import glob
+import gzip
+import os
+import shutil
+import sqlite3
+from typing import Optional
+
+import config
+
+BACKUP_PREFIX = "database-"
+BACKUP_SUFFIX = ".db.gz"
+
+
+def _rotate():
+    # имена содержат время создания, поэтому сортировка по имени — по возрасту
+    backups = sorted(glob.glob(os.path.join(config.BACKUP_DIR, f"{BACKUP_PREFIX}*{BACKUP_SUFFIX}")))
+    for path in backups[:-config.BACKUP_KEEP] if config.BACKUP_KEEP > 0 else []:
+        try:
+            os.remove(path)
+        except OSError as e:
+            print(f"Не удалось удалить старую резервную копию {path}: {e}")
+
+
+def _make_backup() -> str:
+    os.makedirs(config.BACKUP_DIR, exist_ok=True)
+    name = f"{BACKUP_PREFIX}{datetime.datetime.now().strftime('%Y%m%d-%H%M%S')}"
+    raw_path = os.path.join(config.BACKUP_DIR, f"{name}.db.tmp")
+    gz_path = os.path.join(config.BACKUP_DIR, f"{name}{BACKUP_SUFFIX}")
+
+    source = sqlite3.connect(config.DB_PATH, isolation_level=None)
+    target = sqlite3.connect(raw_path)
+    try:
+        # открытая транзакция чтения фиксирует снимок WAL: копия получается
+        # согласованной, а запись в базу идёт параллельно. Без неё бэкап
+        # начинался бы заново после каждой чужой записи и под нагрузкой не
+        # заканчивался бы никогда
+        source.execute('BEGIN')
+        source.execute('SELECT 1 FROM sqlite_master LIMIT 1').fetchall()
+        source.backup(target, pages=config.BACKUP_PAGES, sleep=config.BACKUP_SLEEP)
+        source.execute('COMMIT')
+    except BaseException:
+        # недописанная копия не должна оставаться в папке бэкапов
+        target.close()
+        if os.path.exists(raw_path):
+            os.remove(raw_path)
+        raise
+    finally:
+        target.close()
+        source.close()
+
+    try:
+        with open(raw_path, 'rb') as f_in, gzip.open(f"{gz_path}.tmp", 'wb') as f_out:
+            shutil.copyfileobj(f_in, f_out)
+        os.replace(f"{gz_path}.tmp", gz_path)
+    finally:
+        os.remove(raw_path)
+
+    _rotate()
+    return gz_path
+
+
+class BackupScheduler:
+    def __init__(self):
+        self._lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+
+    async def create(self) -> str:
+        # копирование и сжатие идут в отдельном потоке, цикл бота не блокируется
+        async with self._lock:
+            return await asyncio.to_thread(_make_backup)
+
+    async def start(self):
+        if config.BACKUP_INTERVAL > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(config.BACKUP_INTERVAL)
+            try:
+                path = await self.create()
+                print(f"Резервная копия базы данных сохранена: {path}")
+            except Exception as e:
+                print(f"Ошибка при резервном копировании: {e}")
+
+
+backup_scheduler = BackupScheduler()
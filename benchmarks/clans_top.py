@@ -0,0 +1,78 @@
+# Замер топа кланов на синтетической базе: python -m benchmarks.clans_top [кланов]
+# Старый вариант (запрос на каждый клан и сортировка в Python) сравнивается с текущим.
+import asyncio
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from typing import List, Tuple
+
+import config
+
+# отдельная временная база, рабочая не трогается; путь задаётся до создания пула
+config.DB_PATH = os.path.join(tempfile.mkdtemp(), 'clans_benchmark.db')
+
+from database.cards import init_db  # noqa: E402
+from database.clans import get_top_clans_by_points, initialize_database  # noqa: E402
+from database.pool import pool  # noqa: E402
+
+
+async def top_clans_per_clan_loop(db) -> List[Tuple[str, int, int]]:
+    cursor = await db.execute('SELECT id, name FROM clans')
+    clans = await cursor.fetchall()
+    clan_points_list = []
+    for clan_id, clan_name in clans:
+        cursor_points = await db.execute('''
+            SELECT COUNT(*), COALESCE(SUM(user_data.now_points), 0)
+            FROM clan_members
+            LEFT JOIN user_data ON user_data.user_id = clan_members.user_id
+            WHERE clan_members.clan_id = ?
+        ''', (clan_id,))
+        member_count, total_points = await cursor_points.fetchone()
+        if member_count == 0:
+            continue
+        clan_points_list.append((clan_name, member_count, total_points))
+    clan_points_list.sort(key=lambda x: x[2], reverse=True)
+    return clan_points_list[:10]
+
+
+async def benchmark(clans_count: int):
+    await pool.open()
+    try:
+        await init_db()
+        await initialize_database()
+        random.seed(1)
+        members, users = [], []
+        user_id = 0
+        for clan_id in range(1, clans_count + 1):
+            for _ in range(random.randint(1, 20)):
+                user_id += 1
+                members.append((clan_id, user_id))
+                users.append((user_id, f"user{user_id}", random.randint(0, 100_000)))
+        async with pool.write() as db:
+            await db.executemany(
+                "INSERT INTO clans (id, name, members, creator) VALUES (?, ?, '[]', ?)",
+                [(clan_id, f"clan{clan_id}", clan_id) for clan_id in range(1, clans_count + 1)]
+            )
+            await db.executemany('INSERT INTO clan_members (clan_id, user_id) VALUES (?, ?)', members)
+            await db.executemany('INSERT INTO user_data (user_id, first_name, now_points) VALUES (?, ?, ?)', users)
+        print(f"{clans_count} кланов, {len(users)} участников")
+
+        started = time.perf_counter()
+        async with pool.read() as db:
+            old_top = await top_clans_per_clan_loop(db)
+        print(f"запрос на каждый клан: {(time.perf_counter() - started) * 1000:.0f} мс")
+
+        started = time.perf_counter()
+        new_top = await get_top_clans_by_points()
+        print(f"один запрос:           {(time.perf_counter() - started) * 1000:.0f} мс")
+        print("результаты совпадают" if [tuple(row) for row in new_top] == old_top else "РЕЗУЛЬТАТЫ РАЗЛИЧАЮТСЯ")
+    finally:
+        await pool.close()
+        shutil.rmtree(os.path.dirname(config.DB_PATH))
+
+
+if __name__ == "__main__":
+    asyncio.run(benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 10_000))
@@ -0,0 +1,83 @@
+# Сравнение RateLimitFilter со старой реализацией (полный проход по словарю на
+# каждое сообщение): python -m benchmarks.rate_limit_filter [отслеживаемых пользователей]
+import asyncio
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from aiogram.filters import BaseFilter
+from aiogram.types import Message
+
+from filters import FloodWait
+from filters.FloodWait import RateLimitFilter
+
+
+class OldRateLimitFilter(BaseFilter):
+    def __init__(self, limit: float, expiration_time: float = 3600, clock=time.time):
+        self.limit = limit
+        self.expiration_time = expiration_time
+        self.clock = clock
+        self.last_request_time = {}
+
+    async def __call__(self, message: Message) -> bool:
+        user_id = message.from_user.id
+        current_time = self.clock()
+        self._cleanup_expired(current_time)
+        if user_id in self.last_request_time:
+            last_time = self.last_request_time[user_id]
+            if (current_time - last_time) < self.limit:
+                return False
+        self.last_request_time[user_id] = current_time
+        return True
+
+    def _cleanup_expired(self, current_time: float):
+        expired_keys = [user_id for user_id, last_time in self.last_request_time.items()
+                        if (current_time - last_time) > self.expiration_time]
+        for user_id in expired_keys:
+            del self.last_request_time[user_id]
+
+
+def message(user_id: int):
+    return SimpleNamespace(from_user=SimpleNamespace(id=user_id))
+
+
+async def replay(requests: int = 200_000, users: int = 500) -> bool:
+    # одинаковая последовательность на поддельных часах: решения и итоговое
+    # состояние обоих фильтров должны совпасть
+    clock = [0.0]
+    real_time = FloodWait.time
+    # часы подменяются только для модуля фильтра, а не для всего процесса
+    FloodWait.time = SimpleNamespace(time=lambda: clock[0])
+    try:
+        random.seed(1)
+        old = OldRateLimitFilter(2, expiration_time=5, clock=lambda: clock[0])
+        new = RateLimitFilter(2, expiration_time=5)
+        for _ in range(requests):
+            clock[0] += random.expovariate(50)
+            user_id = random.randrange(users)
+            if await old(message(user_id)) != await new(message(user_id)):
+                return False
+        return old.last_request_time == dict(new.last_request_time)
+    finally:
+        FloodWait.time = real_time
+
+
+async def benchmark(tracked: int, messages: int = 2000):
+    for filter_class in (OldRateLimitFilter, RateLimitFilter):
+        rate_filter = filter_class(1)
+        now = time.time()
+        for user_id in range(tracked):
+            rate_filter.last_request_time[user_id] = now
+        started = time.perf_counter()
+        for user_id in range(tracked, tracked + messages):
+            await rate_filter(message(user_id))
+        elapsed = (time.perf_counter() - started) / messages
+        print(f"{filter_class.__name__:<18} {elapsed * 1e6:9.1f} мкс на сообщение")
+
+
+if __name__ == "__main__":
+    tracked_users = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    print("решения совпадают" if asyncio.run(replay()) else "РЕШЕНИЯ РАЗЛИЧАЮТСЯ")
+    print(f"{tracked_users} отслеживаемых пользователей:")
+    asyncio.run(benchmark(tracked_users))
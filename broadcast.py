@@ -0,0 +1,189 @@
+import asyncio
+import time
+from typing import Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import (
+    TelegramBadRequest,
+    TelegramForbiddenError,
+    TelegramMigrateToChat,
+    TelegramNotFound,
+    TelegramRetryAfter,
+)
+
+import config
+from database.mailing import (
+    PERMANENT_FAILURES,
+    count_broadcast_chats,
+    create_broadcast,
+    finish_broadcast,
+    get_broadcast_chats,
+    get_unfinished_broadcasts,
+    migrate_chat,
+    save_broadcast_page,
+)
+
+# сколько раз повторять отправку в один чат после RetryAfter
+MAX_RETRY_AFTER_ATTEMPTS = 3
+
+# ответы Telegram, после которых чат уже никогда не примет сообщение
+NOT_FOUND_ERRORS = ("chat not found", "peer_id_invalid", "chat_id is empty")
+
+
+def classify_error(error: Exception) -> str:
+    if isinstance(error, TelegramForbiddenError):
+        return "forbidden"
+    if isinstance(error, TelegramNotFound):
+        return "not_found"
+    if isinstance(error, TelegramBadRequest) and any(text in error.message.lower() for text in NOT_FOUND_ERRORS):
+        return "not_found"
+    return "transient"
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        # flood wait в Telegram действует на весь бот, поэтому останавливаем всех отправителей
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0
+        # запас начинает копиться только после паузы, иначе сразу после неё
+        # ушла бы целая пачка сообщений
+        self._updated_at = self._paused_until
+
+
+class Broadcaster:
+    def __init__(self):
+        self._tasks: Set[asyncio.Task] = set()
+        self._shard: Optional[int] = None
+        # один лимит на все рассылки сразу: лимит Telegram общий для бота,
+        # поэтому при нескольких воркерах каждому достаётся своя доля
+        rate = config.BROADCAST_RATE / (config.WORKERS if config.SHARD_INDEX is not None else 1)
+        self._limiter = TokenBucket(rate, max(1.0, rate))
+
+    def start(self, bot: Bot, broadcast: dict):
+        task = asyncio.create_task(self._run(bot, broadcast))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def create(self, bot: Bot, text: str, admin_chat_id: int, progress_message_id: int):
+        broadcast = await create_broadcast(text, admin_chat_id, progress_message_id, self._shard or 0)
+        self.start(bot, broadcast)
+
+    async def resume(self, bot: Bot, shard: Optional[int] = None, workers: int = 1):
+        self._shard = shard
+        # при нескольких воркерах каждый поднимает только свои рассылки,
+        # иначе перезапущенный воркер продублировал бы рассылку соседа
+        for broadcast in await get_unfinished_broadcasts(shard, workers):
+            self.start(bot, broadcast)
+
+    async def stop(self):
+        for task in list(self._tasks):
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def _run(self, bot: Bot, broadcast: dict):
+        semaphore = asyncio.Semaphore(config.BROADCAST_CONCURRENCY)
+        total = await count_broadcast_chats()
+        cursor_id = broadcast["cursor"]
+        sent = broadcast["sent_count"]
+        failed = broadcast["failed_count"]
+        pruned = 0
+        last_report = 0.0
+
+        async def send(chat_id: int):
+            async with semaphore:
+                return chat_id, *await self._send(bot, self._limiter, chat_id, broadcast["text"])
+
+        while True:
+            page = await get_broadcast_chats(cursor_id, config.BROADCAST_PAGE_SIZE)
+            if not page:
+                break
+            results = await asyncio.gather(*(send(chat_id) for _, chat_id in page))
+            cursor_id = page[-1][0]
+            # результаты сохраняются постранично: после падения рассылка продолжится с курсора
+            await save_broadcast_page(broadcast["id"], results, cursor_id)
+            page_sent = sum(1 for _, status, _ in results if status == "sent")
+            sent += page_sent
+            failed += len(results) - page_sent
+            pruned += sum(1 for _, status, _ in results if status in PERMANENT_FAILURES)
+
+            if time.monotonic() - last_report >= config.BROADCAST_PROGRESS_INTERVAL:
+                last_report = time.monotonic()
+                await self._report(
+                    bot, broadcast,
+                    f"📢 **Идёт рассылка...**\n\n"
+                    f"📬 Обработано: {sent + failed} из {total}\n"
+                    f"🎯 Успешно: {sent}\n"
+                    f"⚠️ Не удалось: {failed}"
+                )
+
+        await finish_broadcast(broadcast["id"])
+        await self._report(
+            bot, broadcast,
+            f"✅ **Рассылка завершена.**\n\n"
+            f"🎯 Успешно: {sent}\n"
+            f"⚠️ Не удалось: {failed}\n"
+            f"🗑 Отключено недоступных чатов: {pruned}"
+        )
+
+    @staticmethod
+    async def _send(bot: Bot, limiter: TokenBucket, chat_id: int, text: str):
+        target_id = chat_id
+        for _ in range(MAX_RETRY_AFTER_ATTEMPTS):
+            await limiter.acquire()
+            try:
+                await bot.send_message(
+                    chat_id=target_id,
+                    text=text,
+                    parse_mode='HTML',
+                    disable_web_page_preview=True
+                )
+                return "sent", None
+            except TelegramRetryAfter as e:
+                limiter.pause(e.retry_after)
+            except TelegramMigrateToChat as e:
+                # группа стала супергруппой: переносим запись на новый id и отправляем туда,
+                # если супергруппа уже известна — она получит рассылку по своей записи
+                if target_id != chat_id or not await migrate_chat(chat_id, e.migrate_to_chat_id):
+                    return "migrated", str(e)
+                target_id = e.migrate_to_chat_id
+            except Exception as e:
+                print(f"Не удалось отправить сообщение в чат {chat_id}: {e}")
+                return classify_error(e), str(e)
+        return "transient", "RetryAfter"
+
+    @staticmethod
+    async def _report(bot: Bot, broadcast: dict, text: str):
+        try:
+            await bot.edit_message_text(
+                text=text,
+                chat_id=broadcast["admin_chat_id"],
+                message_id=broadcast["progress_message_id"],
+                parse_mode='Markdown'
+            )
+        except Exception as e:
+            print(f"Не удалось обновить прогресс рассылки: {e}")
+
+
+broadcaster = Broadcaster()
@@ -1 +1,99 @@
+import os
+
 BOT_TOKEN = "BOT_TOKEN"
+
+DB_PATH = "database.db"
+# количество соединений только для чтения (запись идёт через одно отдельное соединение)
+DB_POOL_SIZE = 4
+# PRAGMA для каждого соединения: synchronous=NORMAL в режиме WAL теряет при сбое
+# питания только последние транзакции, но не делает fsync на каждый коммит
+DB_SYNCHRONOUS = "NORMAL"
+DB_CACHE_SIZE_KB = 16_384
+DB_MMAP_SIZE = 256 * 1024 * 1024
+DB_BUSY_TIMEOUT_MS = 5000
+# групповой коммит: операции из pool.submit копятся не дольше DB_BATCH_LATENCY
+# секунд (или до DB_BATCH_SIZE штук) и записываются одной транзакцией
+DB_BATCH_LATENCY = 0.01
+DB_BATCH_SIZE = 200
+# сколько секунд топы живут в кэше, если их не обновили при начислении очков
+LEADERBOARD_TTL = 60
+
+# редкости карточек: шанс выпадения (в процентах), очки за карточку и значок
+RARITIES = {
+    "Редкая": {"weight": 50, "points": 1500, "emoji": "⭐️"},
+    "СверхРедкая": {"weight": 20, "points": 3500, "emoji": "💎"},
+    "Мифическая": {"weight": 15, "points": 5000, "emoji": "✨"},
+    "Легендарная": {"weight": 10, "points": 10000, "emoji": "🌟"},
+    "Анимка": {"weight": 5, "points": 15000, "emoji": "🎥"}
+}
+
+# сколько чатов держать в кэше настроек автоудаления и сколько секунд
+# доверять записи (при нескольких воркерах настройку мог поменять соседний)
+CHAT_SETTINGS_CACHE_SIZE = 10_000
+CHAT_SETTINGS_CACHE_TTL = 60
+
+# рассылка: сообщений в секунду на весь бот (лимит Telegram ~30, при нескольких
+# воркерах делится между ними), одновременных отправок,
+# размер страницы чатов и как часто (в секундах) обновлять прогресс у админа
+BROADCAST_RATE = 25
+BROADCAST_CONCURRENCY = 10
+BROADCAST_PAGE_SIZE = 200
+BROADCAST_PROGRESS_INTERVAL = 5
+
+# антифлуд: по чему считать лимит ("user", "chat" или "user_chat"),
+# лимит по умолчанию (событий в секунду, запас) и отдельные лимиты по флагу
+# обработчика throttling_key
+THROTTLE_KEY = "user"
+THROTTLE_DEFAULT_RATE = (1.0, 1)
+THROTTLE_RATES = {
+    "mcat": (0.5, 1),
+    "top": (0.5, 2),
+    "view_card": (2.0, 3)
+}
+THROTTLE_MAX_KEYS = 10_000
+
+# состояния FSM: как часто сбрасывать изменения в базу и через сколько секунд
+# считать незавершённый диалог брошенным
+FSM_FLUSH_INTERVAL = 1
+FSM_STATE_TTL = 24 * 60 * 60
+
+# режим вебхука вместо long polling: адрес и порт локального сервера, путь,
+# секрет из заголовка X-Telegram-Bot-Api-Secret-Token (обязателен, без него
+# вебхук и sharding.py не запустятся), публичный адрес для setWebhook (пустой —
+# вебхук регистрируется снаружи, например за прокси) и сколько секунд ждать
+# завершения начатых обработчиков при остановке
+WEBHOOK_ENABLED = False
+WEBHOOK_HOST = "127.0.0.1"
+WEBHOOK_PORT = 8080
+WEBHOOK_PATH = "/webhook"
+WEBHOOK_SECRET = ""
+WEBHOOK_URL = ""
+WEBHOOK_DRAIN_TIMEOUT = 30
+
+# несколько процессов: sharding.py принимает вебхук на WEBHOOK_PORT и раздаёт
+# апдейты WORKERS воркерам на портах WORKER_BASE_PORT + номер по id пользователя;
+# SHARD_INDEX выставляет супервизор, у обычного запуска он None
+WORKERS = 4
+WORKER_BASE_PORT = 8081
+SHARD_INDEX = int(os.environ["SHARD_INDEX"]) if "SHARD_INDEX" in os.environ else None
+
+# как часто (в секундах) проверять, не добавил ли карточку другой воркер
+CATALOG_POLL_INTERVAL = 5
+
+# список карточек в админ-панели: карточек на странице и сколько
+# отрисованных страниц держать в кэше
+ADMIN_CARDS_PAGE_SIZE = 20
+ADMIN_CARDS_CACHE_SIZE = 256
+
+# резервные копии: папка, как часто (в секундах, 0 — только вручную) и сколько
+# последних копий хранить; страниц за один шаг бэкапа и пауза между шагами
+BACKUP_DIR = "backups"
+BACKUP_INTERVAL = 6 * 60 * 60
+BACKUP_KEEP = 7
+BACKUP_PAGES = 1024
+BACKUP_SLEEP = 0.005
+
+# листание коллекции в профиле: сколько списков (пользователь, редкость)
+# держать в кэше и сколько секунд
+COLLECTION_CACHE_SIZE = 10_000
+COLLECTION_CACHE_TTL = 300
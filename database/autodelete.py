@@ -0,0 +1,36 @@
+import json
+from typing import List, Optional, Tuple
+
+from database.pool import pool
+
+
+async def add_pending_deletion(chat_id: int, message_ids: List[int], due_at: float, shard: int = 0) -> int:
+    async def insert(db):
+        cursor = await db.execute(
+            'INSERT INTO pending_deletions (chat_id, message_ids, due_at, shard) VALUES (?, ?, ?, ?)',
+            (chat_id, json.dumps(message_ids), due_at, shard)
+        )
+        return cursor.lastrowid
+
+    return await pool.submit(insert)
+
+
+async def get_pending_deletions(shard: Optional[int] = None, workers: int = 1) -> List[Tuple[int, int, List[int], float]]:
+    # воркер поднимает только свои строки; строки воркеров, которых больше нет
+    # (WORKERS уменьшили), достаются воркеру shard % WORKERS
+    query = 'SELECT id, chat_id, message_ids, due_at FROM pending_deletions'
+    params = ()
+    if shard is not None:
+        query += ' WHERE shard % ? = ?'
+        params = (workers, shard)
+    async with pool.read() as db:
+        cursor = await db.execute(query + ' ORDER BY due_at', params)
+        rows = await cursor.fetchall()
+        return [(row_id, chat_id, json.loads(message_ids), due_at) for row_id, chat_id, message_ids, due_at in rows]
+
+
+async def remove_pending_deletions(row_ids: List[int]):
+    if not row_ids:
+        return
+    async with pool.write() as db:
+        await db.executemany('DELETE FROM pending_deletions WHERE id = ?', [(row_id,) for row_id in row_ids])
@@ -1,24 +1,20 @@
-import json
-import aiosqlite
 import datetime
-import os
+from typing import Optional, Tuple
 
-DB_PATH = 'database.db'
+from cachetools import TTLCache
 
-cards_data = {"cards": []}
+import config
+from database.catalog import catalog
+from database.leaderboard import leaderboard
+from database.pool import pool
 
-if os.path.exists('cards.json'):
-    try:
-        with open('cards.json', 'r', encoding='utf-8') as f:
-            cards_data = json.load(f)
-    except json.JSONDecodeError:
-        print("Ошибка декодирования JSON. Файл 'cards.json' может быть поврежден.")
-else:
-    print("Файл 'cards.json' не найден.")
+# упорядоченные id карточек пользователя по редкости для листания коллекции;
+# сбрасываются, когда пользователь получает новую карточку
+_collection_cache = TTLCache(maxsize=config.COLLECTION_CACHE_SIZE, ttl=config.COLLECTION_CACHE_TTL)
 
 
 async def init_db():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with pool.write() as db:
         await db.execute('''
             CREATE TABLE IF NOT EXISTS user_data (
                 user_id INTEGER PRIMARY KEY,
@@ -26,115 +22,147 @@ async def init_db():
                 cards TEXT DEFAULT '[]',
                 all_points INTEGER DEFAULT 0,
                 now_points INTEGER DEFAULT 0,
-                last_received_at TEXT
+                last_received_at TEXT,
+                card_count INTEGER DEFAULT 0
             )
         ''')
-        await db.commit()
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS user_cards (
+                user_id INTEGER NOT NULL,
+                card_id INTEGER NOT NULL,
+                obtained_at TEXT,
+                count INTEGER DEFAULT 1,
+                PRIMARY KEY (user_id, card_id)
+            ) WITHOUT ROWID
+        ''')
 
 
-async def get_last_card_time(user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+async def _award_card(db, user_id, first_name, card_id, timestamp, points):
+    cursor = await db.execute('''
+        INSERT OR IGNORE INTO user_cards (user_id, card_id, obtained_at)
+        VALUES (?, ?, ?)
+    ''', (user_id, card_id, timestamp.isoformat()))
+    is_new = cursor.rowcount == 1
+    if not is_new:
+        await db.execute('''
+            UPDATE user_cards SET count = count + 1 WHERE user_id = ? AND card_id = ?
+        ''', (user_id, card_id))
+
+    await db.execute('''
+        INSERT INTO user_data (user_id, first_name, all_points, now_points, last_received_at, card_count)
+        VALUES (?, ?, ?, ?, ?, ?)
+        ON CONFLICT(user_id) DO UPDATE SET
+            first_name = excluded.first_name,
+            all_points = all_points + excluded.all_points,
+            now_points = now_points + excluded.now_points,
+            last_received_at = excluded.last_received_at,
+            card_count = card_count + excluded.card_count
+    ''', (user_id, first_name, points, points, timestamp.isoformat(), int(is_new)))
+
+    cursor = await db.execute(
+        'SELECT card_count, now_points, all_points FROM user_data WHERE user_id = ?', (user_id,)
+    )
+    card_count, now_points, all_points = await cursor.fetchone()
+    await cursor.close()
+    return is_new, (card_count, now_points, all_points)
+
+
+def _forget_collection(user_id, rarity=None):
+    for key in [rarity] if rarity is not None else config.RARITIES:
+        _collection_cache.pop((user_id, key), None)
+
+
+async def claim_card(user_id, first_name, timestamp, cooldown_seconds, roll_card):
+    # проверка кулдауна, выбор карточки и начисление идут в одной транзакции,
+    # поэтому два быстрых сообщения подряд не получат две карточки; выдачи
+    # разных пользователей коммитятся вместе через групповой коммит
+    async def claim(db):
         cursor = await db.execute('SELECT last_received_at FROM user_data WHERE user_id = ?', (user_id,))
         result = await cursor.fetchone()
         await cursor.close()
         if result and result[0]:
-            return datetime.datetime.fromisoformat(result[0])
-        else:
-            return None
+            elapsed_seconds = (timestamp - datetime.datetime.fromisoformat(result[0])).total_seconds()
+            if elapsed_seconds < cooldown_seconds:
+                return {"status": "cooldown", "remaining": int(cooldown_seconds - elapsed_seconds)}
 
+        rarity, card, points = roll_card()
+        if card is None:
+            return {"status": "empty", "rarity": rarity}
 
-async def add_card_and_points(user_id, first_name, card_id, timestamp, points):
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('SELECT cards, all_points, now_points FROM user_data WHERE user_id = ?', (user_id,))
-        result = await cursor.fetchone()
+        is_new, totals = await _award_card(db, user_id, first_name, card["id"], timestamp, points)
+        return {"status": "new" if is_new else "duplicate", "rarity": rarity, "card": card, "points": points, "totals": totals}
 
-        if result is None:
-            cards = json.dumps([card_id])
-            await db.execute('''
-                INSERT INTO user_data (user_id, first_name, cards, all_points, now_points, last_received_at)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (user_id, first_name, cards, points, points, timestamp.isoformat()))
-        else:
-            cards, all_points, now_points = result
-            cards_list = json.loads(cards)
-
-            if card_id not in cards_list:
-                cards_list.append(card_id)
-                cards = json.dumps(cards_list)
-
-            await db.execute('''
-                UPDATE user_data
-                SET first_name = ?,
-                    cards = ?,
-                    all_points = all_points + ?,
-                    now_points = now_points + ?,
-                    last_received_at = ?
-                WHERE user_id = ?
-            ''', (first_name, cards, points, points, timestamp.isoformat(), user_id))
-
-        await db.commit()
-
-
-async def has_user_card(user_id, card_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('SELECT cards FROM user_data WHERE user_id = ?', (user_id,))
-        result = await cursor.fetchone()
-        print(result)
-        await cursor.close()
-        if result:
-            cards = json.loads(result[0])
-            print(cards)
-            return card_id in cards
-        return False
+    claim_result = await pool.submit(claim)
+    totals = claim_result.pop("totals", None)
+    if totals is not None:
+        leaderboard.record_award(user_id, first_name, *totals)
+    if claim_result["status"] == "new":
+        _forget_collection(user_id, claim_result["rarity"])
+    return claim_result
 
 
 async def reset_cooldown(user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with pool.write() as db:
         await db.execute('UPDATE user_data SET last_received_at = NULL WHERE user_id = ?', (user_id,))
-        await db.commit()
 
 
 async def get_user_profile_data(user_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('SELECT cards, now_points, all_points FROM user_data WHERE user_id = ?', (user_id,))
+    async with pool.read() as db:
+        cursor = await db.execute('SELECT now_points, all_points, card_count FROM user_data WHERE user_id = ?', (user_id,))
         result = await cursor.fetchone()
         await cursor.close()
-
-        if result:
-            cards = json.loads(result[0])
-            now_points = result[1]
-            all_points = result[2]
-            return {
-                "cards": cards,
-                "now_points": now_points,
-                "all_points": all_points
-            }
-        return None
+        if result is None:
+            return None
+        return {
+            "card_count": result[2],
+            "now_points": result[0],
+            "all_points": result[1]
+        }
+
+
+async def get_collection_ids(user_id, rarity) -> Tuple[str, ...]:
+    key = (user_id, rarity)
+    card_ids = _collection_cache.get(key)
+    if card_ids is None:
+        # user_cards читается по первичному ключу (user_id, card_id), cards — по id
+        async with pool.read() as db:
+            cursor = await db.execute('''
+                SELECT user_cards.card_id
+                FROM user_cards
+                JOIN cards ON cards.id = user_cards.card_id
+                WHERE user_cards.user_id = ? AND cards.rarity = ?
+                ORDER BY user_cards.card_id
+            ''', (user_id, rarity))
+            card_ids = tuple(str(row[0]) for row in await cursor.fetchall())
+            await cursor.close()
+        _collection_cache[key] = card_ids
+    return card_ids
+
+
+async def get_collection_card(user_id, rarity, index) -> Tuple[Optional[dict], int, int]:
+    card_ids = await get_collection_ids(user_id, rarity)
+    if not card_ids:
+        return None, 0, 0
+    index = min(max(index, 0), len(card_ids) - 1)
+    return catalog.get(card_ids[index]), index, len(card_ids)
 
 
 async def get_top_users_by_cards():
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('SELECT user_id, first_name, cards FROM user_data')
-        all_users = await cursor.fetchall()
-        user_card_counts = []
-        for user_id, first_name, cards_json in all_users:
-            cards_list = json.loads(cards_json)
-            card_count = len(cards_list)
-            user_card_counts.append((user_id, first_name, card_count))
-        user_card_counts.sort(key=lambda x: x[2], reverse=True)
-        top_users = user_card_counts[:10]
-        return top_users
+    async with pool.read() as db:
+        cursor = await db.execute('SELECT user_id, first_name, card_count FROM user_data ORDER BY card_count DESC LIMIT 10')
+        result = await cursor.fetchall()
+        return result
 
 
 async def get_top_users_by_now_points():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with pool.read() as db:
         cursor = await db.execute('SELECT user_id, first_name, now_points FROM user_data ORDER BY now_points DESC LIMIT 10')
         result = await cursor.fetchall()
         return result
 
 
 async def get_top_users_by_all_points():
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with pool.read() as db:
         cursor = await db.execute('SELECT user_id, first_name, all_points FROM user_data ORDER BY all_points DESC LIMIT 10')
         result = await cursor.fetchall()
         return result
\ No newline at end of file
@@ -0,0 +1,126 @@
+import asyncio
+import random
+from typing import Dict, Iterable, Optional, Tuple
+
+import config
+from database.pool import pool
+
+
+class CatalogSnapshot:
+    # неизменяемый снимок каталога: при любом изменении собирается новый
+    def __init__(self, cards: Iterable[dict] = (), version: int = 0):
+        self.version = version
+        self.cards: Tuple[dict, ...] = tuple(cards)
+        self.by_id: Dict[str, dict] = {card["id"]: card for card in self.cards}
+        by_rarity: Dict[str, list] = {}
+        for card in self.cards:
+            by_rarity.setdefault(card["rarity"], []).append(card)
+        self.by_rarity: Dict[str, Tuple[dict, ...]] = {rarity: tuple(items) for rarity, items in by_rarity.items()}
+
+
+def _row_to_card(row) -> dict:
+    card_id, name, rarity, file_id, media_type = row
+    return {
+        "name": name,
+        "id": str(card_id),
+        "rarity": rarity,
+        "file_id": file_id,
+        "media_type": media_type or "photo"
+    }
+
+
+async def _read_version(db) -> int:
+    cursor = await db.execute('SELECT version FROM catalog_version WHERE id = 1')
+    result = await cursor.fetchone()
+    await cursor.close()
+    return result[0] if result else 0
+
+
+class CardCatalog:
+    def __init__(self):
+        self._snapshot = CatalogSnapshot()
+        self._poll_task: Optional[asyncio.Task] = None
+
+    @property
+    def snapshot(self) -> CatalogSnapshot:
+        return self._snapshot
+
+    @property
+    def version(self) -> int:
+        return self._snapshot.version
+
+    @property
+    def cards(self) -> Tuple[dict, ...]:
+        return self._snapshot.cards
+
+    def get(self, card_id) -> Optional[dict]:
+        return self._snapshot.by_id.get(str(card_id))
+
+    def by_rarity(self, rarity: str) -> Tuple[dict, ...]:
+        return self._snapshot.by_rarity.get(rarity, ())
+
+    def random_card(self, rarity: str) -> Optional[dict]:
+        cards = self.by_rarity(rarity)
+        return random.choice(cards) if cards else None
+
+    async def load(self):
+        async with pool.read() as db:
+            # версия и карточки читаются одним снимком WAL
+            await db.execute('BEGIN')
+            try:
+                version = await _read_version(db)
+                cursor = await db.execute('SELECT id, name, rarity, file_id, media_type FROM cards ORDER BY id')
+                rows = await cursor.fetchall()
+                await cursor.close()
+            finally:
+                await db.rollback()
+        # снимок подменяется одним присваиванием, поэтому обработчики
+        # никогда не видят каталог наполовину обновлённым
+        self._snapshot = CatalogSnapshot([_row_to_card(row) for row in rows], version)
+
+    async def refresh(self):
+        async with pool.read() as db:
+            version = await _read_version(db)
+        if version != self._snapshot.version:
+            await self.load()
+
+    async def add(self, name: str, rarity: str, file_id: str, media_type: str) -> dict:
+        async with pool.write() as db:
+            cursor = await db.execute(
+                'INSERT INTO cards (name, rarity, file_id, media_type) VALUES (?, ?, ?, ?)',
+                (name, rarity, file_id, media_type)
+            )
+            card = _row_to_card((cursor.lastrowid, name, rarity, file_id, media_type))
+            version = await _read_version(db)
+
+        snapshot = self._snapshot
+        if version == snapshot.version + 1:
+            self._snapshot = CatalogSnapshot(snapshot.cards + (card,), version)
+        else:
+            # каталог успел поменять другой воркер
+            await self.load()
+        return card
+
+    async def start(self):
+        self._poll_task = asyncio.create_task(self._poll())
+
+    async def stop(self):
+        if self._poll_task is None:
+            return
+        self._poll_task.cancel()
+        try:
+            await self._poll_task
+        except asyncio.CancelledError:
+            pass
+        self._poll_task = None
+
+    async def _poll(self):
+        while True:
+            await asyncio.sleep(config.CATALOG_POLL_INTERVAL)
+            try:
+                await self.refresh()
+            except Exception as e:
+                print(f"Ошибка при обновлении каталога карточек: {e}")
+
+
+catalog = CardCatalog()
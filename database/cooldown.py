@@ -1,10 +1,16 @@
-import aiosqlite
+from typing import Tuple
 
-DB_PATH = 'database.db'
+from cachetools import TTLCache
+
+import config
+from database.pool import pool
+
+# настройки меняются редко, а читаются на каждую выдачу карточки в группе
+_settings_cache = TTLCache(maxsize=config.CHAT_SETTINGS_CACHE_SIZE, ttl=config.CHAT_SETTINGS_CACHE_TTL)
 
 
 async def init_cd_db():
-    async with aiosqlite.connect("database.db") as db:
+    async with pool.write() as db:
         await db.execute('''
             CREATE TABLE IF NOT EXISTS cooldown (
                 chat_id INTEGER PRIMARY KEY,
@@ -12,19 +18,30 @@ async def init_cd_db():
                 cooldown INTEGER
             )
         ''')
-        await db.commit()
+
+
+async def get_chat_settings(chat_id) -> Tuple[str, int]:
+    settings = _settings_cache.get(chat_id)
+    if settings is None:
+        async with pool.read() as db:
+            cursor = await db.execute('SELECT on_or_off, cooldown FROM cooldown WHERE chat_id = ?', (chat_id,))
+            result = await cursor.fetchone()
+            await cursor.close()
+        if result:
+            settings = (result[0] or "off", int(result[1] or 0))
+        else:
+            settings = ("off", 0)
+        _settings_cache[chat_id] = settings
+    return settings
 
 
 async def get_cooldown_state(chat_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('SELECT on_or_off FROM cooldown WHERE chat_id = ?', (chat_id,))
-        result = await cursor.fetchone()
-        await cursor.close()
-        return result[0] if result else "off"
+    state, _ = await get_chat_settings(chat_id)
+    return state
 
 
 async def toggle_cooldown_state(chat_id):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with pool.write() as db:
         cursor = await db.execute('SELECT on_or_off FROM cooldown WHERE chat_id = ?', (chat_id,))
         result = await cursor.fetchone()
         await cursor.close()
@@ -35,23 +52,16 @@ async def toggle_cooldown_state(chat_id):
             INSERT INTO cooldown (chat_id, on_or_off) VALUES (?, ?)
             ON CONFLICT(chat_id) DO UPDATE SET on_or_off = ?
         ''', (chat_id, new_state, new_state))
-        await db.commit()
 
+    _settings_cache.pop(chat_id, None)
     return new_state
 
 
 async def set_cooldown_time(chat_id, minutes):
-    async with aiosqlite.connect(DB_PATH) as db:
+    async with pool.write() as db:
         await db.execute('''
             INSERT INTO cooldown (chat_id, cooldown) VALUES (?, ?)
             ON CONFLICT(chat_id) DO UPDATE SET cooldown = ?
         ''', (chat_id, minutes, minutes))
-        await db.commit()
-
+    _settings_cache.pop(chat_id, None)
 
-async def get_cooldown_time(chat_id):
-    async with aiosqlite.connect(DB_PATH) as db:
-        cursor = await db.execute('SELECT cooldown FROM cooldown WHERE chat_id = ?', (chat_id,))
-        result = await cursor.fetchone()
-        await cursor.close()
-        return int(result[0]) if result else 0
@@ -0,0 +1,125 @@
+import asyncio
+import json
+import time
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, DefaultKeyBuilder, KeyBuilder, StateType, StorageKey
+
+from database.pool import pool
+
+
+class SQLiteStorage(BaseStorage):
+    def __init__(
+            self,
+            flush_interval: float = 1,
+            state_ttl: float = 24 * 60 * 60,
+            key_builder: Optional[KeyBuilder] = None):
+        self.flush_interval = flush_interval
+        self.state_ttl = state_ttl
+        self.key_builder = key_builder or DefaultKeyBuilder(with_bot_id=True, with_destiny=True)
+        # изменения копятся здесь и пишутся в базу пачкой раз в flush_interval;
+        # чтение сначала смотрит в буфер, поэтому обработчики всегда видят свои записи
+        self._dirty: Dict[str, Tuple[Optional[str], Dict[str, Any], float]] = {}
+        # пачка, которая сейчас пишется: до коммита её тоже нужно видеть при чтении
+        self._flushing: Dict[str, Tuple[Optional[str], Dict[str, Any], float]] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_sleeping = False
+
+    def _build_key(self, key: StorageKey) -> str:
+        return self.key_builder.build(key)
+
+    async def _load(self, key: str) -> Tuple[Optional[str], Dict[str, Any]]:
+        for buffer in (self._dirty, self._flushing):
+            if key in buffer:
+                state, data, _ = buffer[key]
+                return state, data
+        async with pool.read() as db:
+            cursor = await db.execute(
+                'SELECT state, data FROM fsm_states WHERE key = ? AND updated_at > ?',
+                (key, time.time() - self.state_ttl)
+            )
+            result = await cursor.fetchone()
+            await cursor.close()
+        if result is None:
+            return None, {}
+        return result[0], json.loads(result[1] or '{}')
+
+    async def _store(self, key: str, state: Optional[str], data: Dict[str, Any]):
+        self._dirty[key] = (state, data, time.time())
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+
+    async def _flush_later(self):
+        while True:
+            self._flush_sleeping = True
+            try:
+                await asyncio.sleep(self.flush_interval)
+            finally:
+                self._flush_sleeping = False
+            await self.flush()
+            # то, что записали во время сброса, уходит следующей пачкой
+            if not self._dirty:
+                return
+
+    async def flush(self):
+        dirty = self._dirty
+        self._dirty = {}
+        self._flushing = dirty
+        try:
+            await self._write(dirty)
+        except Exception as e:
+            print(f"Ошибка при сохранении состояний FSM: {e}")
+            # более свежие изменения из _dirty важнее несохранённой пачки
+            for key, value in dirty.items():
+                self._dirty.setdefault(key, value)
+        finally:
+            self._flushing = {}
+
+    async def _write(self, dirty):
+        async with pool.write() as db:
+            if dirty:
+                await db.executemany(
+                    'DELETE FROM fsm_states WHERE key = ?',
+                    [(key,) for key, (state, data, _) in dirty.items() if state is None and not data]
+                )
+                await db.executemany(
+                    'INSERT OR REPLACE INTO fsm_states (key, state, data, updated_at) VALUES (?, ?, ?, ?)',
+                    [
+                        (key, state, json.dumps(data, ensure_ascii=False), updated_at)
+                        for key, (state, data, updated_at) in dirty.items()
+                        if state is not None or data
+                    ]
+                )
+            # брошенные диалоги удаляются, чтобы таблица не росла бесконечно
+            await db.execute('DELETE FROM fsm_states WHERE updated_at <= ?', (time.time() - self.state_ttl,))
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        storage_key = self._build_key(key)
+        _, data = await self._load(storage_key)
+        await self._store(storage_key, state.state if isinstance(state, State) else state, data)
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        state, _ = await self._load(self._build_key(key))
+        return state
+
+    async def set_data(self, key: StorageKey, data: Mapping[str, Any]) -> None:
+        storage_key = self._build_key(key)
+        state, _ = await self._load(storage_key)
+        await self._store(storage_key, state, dict(data))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        _, data = await self._load(self._build_key(key))
+        return dict(data)
+
+    async def close(self) -> None:
+        task = self._flush_task
+        if task is not None and not task.done():
+            # отменять можно только ожидание: начатый сброс уже забрал пачку
+            if self._flush_sleeping:
+                task.cancel()
+            try:
+                await task
+            except asyncio.CancelledError:
+                pass
+        await self.flush()
@@ -0,0 +1,49 @@
+import time
+from typing import Awaitable, Callable, Dict, List, Tuple
+
+import config
+
+
+class LeaderboardCache:
+    def __init__(self, ttl: float = 60, size: int = 10):
+        self.ttl = ttl
+        self.size = size
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[float, List[tuple]]] = {}
+
+    async def get(self, kind: str, loader: Callable[[], Awaitable[list]]) -> List[tuple]:
+        entry = self._entries.get(kind)
+        if entry is not None and entry[0] > time.monotonic():
+            self.hits += 1
+            return entry[1]
+
+        self.misses += 1
+        rows = [tuple(row) for row in await loader()]
+        self._entries[kind] = (time.monotonic() + self.ttl, rows)
+        return rows
+
+    def update_user(self, kind: str, user_id: int, first_name: str, value: int):
+        # значения в топах игроков только растут, поэтому игрок, не попавший
+        # в закэшированный топ, может вытеснить из него лишь последнюю строку
+        entry = self._entries.get(kind)
+        if entry is None:
+            return
+        expires_at, rows = entry
+        if len(rows) >= self.size and user_id not in (row[0] for row in rows) and value <= rows[-1][2]:
+            return
+        rows = [row for row in rows if row[0] != user_id]
+        rows.append((user_id, first_name, value))
+        rows.sort(key=lambda row: row[2], reverse=True)
+        self._entries[kind] = (expires_at, rows[:self.size])
+
+    def record_award(self, user_id: int, first_name: str, card_count: int, now_points: int, all_points: int):
+        self.update_user("cards", user_id, first_name, card_count)
+        self.update_user("points", user_id, first_name, now_points)
+        self.update_user("all", user_id, first_name, all_points)
+
+    def invalidate(self, kind: str):
+        self._entries.pop(kind, None)
+
+
+leaderboard = LeaderboardCache(config.LEADERBOARD_TTL)
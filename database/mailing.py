@@ -1,39 +1,132 @@
-import aiosqlite
+import datetime
+from typing import List, Optional, Tuple
 
+from database.pool import pool
 
-# создание таблицы
-async def create_table():
-    async with aiosqlite.connect("database.db") as db:
-        await db.execute("""
-            CREATE TABLE IF NOT EXISTS chat_users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER UNIQUE,
-                chat_id INTEGER UNIQUE
-            )
-        """)
-        await db.commit()
+# чаты с такими ошибками рассылки больше не получают сообщений
+PERMANENT_FAILURES = ("forbidden", "not_found")
 
 
 # добавление пользователя
 async def add_user(user_id: int):
-    async with aiosqlite.connect("database.db") as db:
-        await db.execute("INSERT OR IGNORE INTO chat_users (user_id) VALUES (?)", (user_id,))
-        await db.commit()
+    seen_at = datetime.datetime.now().isoformat()
+
+    async def write(db):
+        await db.execute("""
+            INSERT INTO known_users (user_id, first_seen, last_seen) VALUES (?, ?, ?)
+            ON CONFLICT(user_id) DO UPDATE SET last_seen = excluded.last_seen
+        """, (user_id, seen_at, seen_at))
+
+    # регистрации из разных апдейтов коммитятся вместе через групповой коммит
+    await pool.submit(write)
 
 
 # добавление чата
 async def add_chat(chat_id: int):
-    async with aiosqlite.connect("database.db") as db:
-        await db.execute("INSERT OR IGNORE INTO chat_users (chat_id) VALUES (?)", (chat_id,))
-        await db.commit()
+    seen_at = datetime.datetime.now().isoformat()
+
+    async def write(db):
+        # бот снова добавлен в чат, который рассылка пометила неактивным
+        await db.execute("""
+            INSERT INTO known_chats (chat_id, first_seen, last_seen) VALUES (?, ?, ?)
+            ON CONFLICT(chat_id) DO UPDATE SET last_seen = excluded.last_seen, active = 1
+        """, (chat_id, seen_at, seen_at))
+
+    await pool.submit(write)
 
 
 async def get_stats():
-    async with aiosqlite.connect("database.db") as db:
-        cursor = await db.execute("SELECT COUNT(DISTINCT user_id) FROM chat_users")
-        users_count = (await cursor.fetchone())[0]
+    async with pool.read() as db:
+        cursor = await db.execute("SELECT name, value FROM mailing_counters")
+        counters = dict(await cursor.fetchall())
+    return counters.get("users", 0), counters.get("chats", 0)
+
+
+async def create_broadcast(text: str, admin_chat_id: int, progress_message_id: int, shard: int = 0) -> dict:
+    async with pool.write() as db:
+        cursor = await db.execute(
+            "INSERT INTO broadcasts (text, admin_chat_id, progress_message_id, created_at, shard) VALUES (?, ?, ?, ?, ?)",
+            (text, admin_chat_id, progress_message_id, datetime.datetime.now().isoformat(), shard)
+        )
+    return {
+        "id": cursor.lastrowid,
+        "text": text,
+        "admin_chat_id": admin_chat_id,
+        "progress_message_id": progress_message_id,
+        "cursor": 0,
+        "sent_count": 0,
+        "failed_count": 0
+    }
+
+
+async def get_unfinished_broadcasts(shard: Optional[int] = None, workers: int = 1) -> List[dict]:
+    # как и отложенные удаления: воркер поднимает только свои рассылки, а рассылки
+    # воркеров, которых больше нет (WORKERS уменьшили), достаются воркеру shard % WORKERS
+    query = """
+        SELECT id, text, admin_chat_id, progress_message_id, cursor, sent_count, failed_count
+        FROM broadcasts WHERE status = 'running'
+    """
+    params = ()
+    if shard is not None:
+        query += " AND shard % ? = ?"
+        params = (workers, shard)
+    async with pool.read() as db:
+        cursor = await db.execute(query + " ORDER BY id", params)
+        rows = await cursor.fetchall()
+    keys = ("id", "text", "admin_chat_id", "progress_message_id", "cursor", "sent_count", "failed_count")
+    return [dict(zip(keys, row)) for row in rows]
+
+
+# постраничная выборка чатов по курсору (id строки), без загрузки всех id в память
+async def get_broadcast_chats(after_id: int, limit: int) -> List[Tuple[int, int]]:
+    async with pool.read() as db:
+        cursor = await db.execute(
+            "SELECT id, chat_id FROM known_chats WHERE id > ? AND active = 1 ORDER BY id LIMIT ?",
+            (after_id, limit)
+        )
+        return await cursor.fetchall()
+
+
+async def count_broadcast_chats() -> int:
+    async with pool.read() as db:
+        cursor = await db.execute("SELECT value FROM mailing_counters WHERE name = 'chats'")
+        return (await cursor.fetchone())[0]
+
+
+async def save_broadcast_page(broadcast_id: int, results: List[Tuple[int, str, Optional[str]]], cursor_id: int):
+    sent = sum(1 for _, status, _ in results if status == "sent")
+    async with pool.write() as db:
+        await db.executemany(
+            "INSERT OR REPLACE INTO broadcast_results (broadcast_id, chat_id, status, error) VALUES (?, ?, ?, ?)",
+            [(broadcast_id, chat_id, status, error) for chat_id, status, error in results]
+        )
+        await db.executemany(
+            "UPDATE known_chats SET active = 0 WHERE chat_id = ?",
+            [(chat_id,) for chat_id, status, _ in results if status in PERMANENT_FAILURES]
+        )
+        await db.execute("""
+            UPDATE broadcasts
+            SET cursor = ?, sent_count = sent_count + ?, failed_count = failed_count + ?
+            WHERE id = ?
+        """, (cursor_id, sent, len(results) - sent, broadcast_id))
+
+
+async def migrate_chat(old_chat_id: int, new_chat_id: int) -> bool:
+    async with pool.write() as db:
+        cursor = await db.execute("SELECT 1 FROM known_chats WHERE chat_id = ?", (new_chat_id,))
+        already_known = await cursor.fetchone()
+        await cursor.close()
+        if already_known:
+            await db.execute("UPDATE known_chats SET active = 0 WHERE chat_id = ?", (old_chat_id,))
+            return False
+        # id строки сохраняется, поэтому курсоры рассылок остаются верными
+        await db.execute("UPDATE known_chats SET chat_id = ? WHERE chat_id = ?", (new_chat_id, old_chat_id))
+        return True
 
-        cursor = await db.execute("SELECT COUNT(DISTINCT chat_id) FROM chat_users")
-        chats_count = (await cursor.fetchone())[0]
 
-    return users_count, chats_count
\ No newline at end of file
+async def finish_broadcast(broadcast_id: int):
+    async with pool.write() as db:
+        await db.execute(
+            "UPDATE broadcasts SET status = 'done', finished_at = ? WHERE id = ?",
+            (datetime.datetime.now().isoformat(), broadcast_id)
+        )
@@ -0,0 +1,291 @@
+import datetime
+import json
+import logging
+import os
+
+from database.pool import pool
+
+# до миграции 8 каталог карточек хранился в этом файле
+CARDS_JSON_PATH = 'cards.json'
+
+
+async def _has_table(db, name: str) -> bool:
+    cursor = await db.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+    result = await cursor.fetchone()
+    await cursor.close()
+    return result is not None
+
+
+async def _add_chat_users_active(db):
+    if await _has_table(db, 'chat_users'):
+        await db.execute('ALTER TABLE chat_users ADD COLUMN active INTEGER DEFAULT 1')
+
+
+async def _move_chat_users(db):
+    # chat_users хранил пользователей и чаты в одной таблице полупустыми строками;
+    # id чатов переносятся как есть, чтобы курсоры незавершённых рассылок остались верными
+    if not await _has_table(db, 'chat_users'):
+        return
+    now = datetime.datetime.now().isoformat()
+    await db.execute('''
+        INSERT OR IGNORE INTO known_users (user_id, first_seen, last_seen)
+        SELECT user_id, ?, ? FROM chat_users WHERE user_id IS NOT NULL
+    ''', (now, now))
+    await db.execute('''
+        INSERT OR IGNORE INTO known_chats (id, chat_id, first_seen, last_seen, active)
+        SELECT id, chat_id, ?, ?, active FROM chat_users WHERE chat_id IS NOT NULL
+    ''', (now, now))
+    await db.execute('DROP TABLE chat_users')
+
+
+async def _add_card_count(db):
+    # в базах, созданных после перехода на card_count, столбец уже есть
+    cursor = await db.execute('PRAGMA table_info(user_data)')
+    columns = [row[1] for row in await cursor.fetchall()]
+    await cursor.close()
+    if 'card_count' not in columns:
+        await db.execute('ALTER TABLE user_data ADD COLUMN card_count INTEGER DEFAULT 0')
+    await db.execute('''
+        UPDATE user_data
+        SET card_count = (SELECT COUNT(*) FROM user_cards WHERE user_cards.user_id = user_data.user_id)
+    ''')
+
+
+async def _import_cards_json(db):
+    # id переносятся как есть: на них ссылаются user_cards
+    if not os.path.exists(CARDS_JSON_PATH):
+        return
+    try:
+        with open(CARDS_JSON_PATH, 'r', encoding='utf-8') as f:
+            cards = json.load(f).get("cards", [])
+    except json.JSONDecodeError:
+        print(f"Ошибка декодирования JSON. Файл '{CARDS_JSON_PATH}' может быть поврежден.")
+        return
+    await db.executemany('''
+        INSERT OR IGNORE INTO cards (id, name, rarity, file_id, media_type) VALUES (?, ?, ?, ?, ?)
+    ''', [
+        (int(card["id"]), card.get("name"), card["rarity"], card.get("file_id"), card.get("media_type", "photo"))
+        for card in cards
+        if str(card.get("id")).isdigit()
+    ])
+
+
+# Миграции применяются по порядку и ровно один раз.
+# Каждый шаг — SQL-строка или async-функция, принимающая соединение.
+MIGRATIONS = [
+    (1, [
+        'CREATE INDEX IF NOT EXISTS idx_user_data_now_points ON user_data (now_points DESC)',
+    ]),
+    (2, [
+        'CREATE INDEX IF NOT EXISTS idx_user_data_all_points ON user_data (all_points DESC)',
+    ]),
+    (3, [
+        '''
+        CREATE TABLE IF NOT EXISTS pending_deletions (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL,
+            message_ids TEXT NOT NULL,
+            due_at REAL NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_pending_deletions_due_at ON pending_deletions (due_at)',
+    ]),
+    (4, [
+        '''
+        CREATE TABLE IF NOT EXISTS broadcasts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            text TEXT NOT NULL,
+            admin_chat_id INTEGER NOT NULL,
+            progress_message_id INTEGER,
+            cursor INTEGER DEFAULT 0,
+            sent_count INTEGER DEFAULT 0,
+            failed_count INTEGER DEFAULT 0,
+            status TEXT DEFAULT 'running',
+            created_at TEXT,
+            finished_at TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS broadcast_results (
+            broadcast_id INTEGER NOT NULL,
+            chat_id INTEGER NOT NULL,
+            status TEXT NOT NULL,
+            error TEXT,
+            PRIMARY KEY (broadcast_id, chat_id)
+        ) WITHOUT ROWID
+        ''',
+    ]),
+    (5, [
+        _add_chat_users_active,
+    ]),
+    (6, [
+        '''
+        CREATE TABLE IF NOT EXISTS known_users (
+            user_id INTEGER PRIMARY KEY,
+            first_seen TEXT,
+            last_seen TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS known_chats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            chat_id INTEGER NOT NULL UNIQUE,
+            first_seen TEXT,
+            last_seen TEXT,
+            active INTEGER DEFAULT 1
+        )
+        ''',
+        # счётчики для статистики поддерживаются триггерами, чтобы не считать строки каждый раз
+        '''
+        CREATE TABLE IF NOT EXISTS mailing_counters (
+            name TEXT PRIMARY KEY,
+            value INTEGER DEFAULT 0
+        )
+        ''',
+        "INSERT OR IGNORE INTO mailing_counters (name, value) VALUES ('users', 0), ('chats', 0)",
+        '''
+        CREATE TRIGGER IF NOT EXISTS known_users_count AFTER INSERT ON known_users
+        BEGIN
+            UPDATE mailing_counters SET value = value + 1 WHERE name = 'users';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS known_chats_count AFTER INSERT ON known_chats
+        WHEN NEW.active = 1
+        BEGIN
+            UPDATE mailing_counters SET value = value + 1 WHERE name = 'chats';
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS known_chats_active_count AFTER UPDATE OF active ON known_chats
+        WHEN NEW.active != OLD.active
+        BEGIN
+            UPDATE mailing_counters SET value = value + NEW.active - OLD.active WHERE name = 'chats';
+        END
+        ''',
+        _move_chat_users,
+    ]),
+    (7, [
+        '''
+        CREATE TABLE IF NOT EXISTS fsm_states (
+            key TEXT PRIMARY KEY,
+            state TEXT,
+            data TEXT,
+            updated_at REAL NOT NULL
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_fsm_states_updated_at ON fsm_states (updated_at)',
+    ]),
+    (8, [
+        '''
+        CREATE TABLE IF NOT EXISTS cards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            rarity TEXT NOT NULL,
+            file_id TEXT,
+            media_type TEXT DEFAULT 'photo'
+        )
+        ''',
+        'CREATE INDEX IF NOT EXISTS idx_cards_rarity ON cards (rarity)',
+        # версия каталога растёт при любом изменении cards, по ней воркеры
+        # понимают, что пора перечитать свой снимок
+        '''
+        CREATE TABLE IF NOT EXISTS catalog_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL
+        )
+        ''',
+        'INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)',
+        '''
+        CREATE TRIGGER IF NOT EXISTS cards_version_insert AFTER INSERT ON cards
+        BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS cards_version_update AFTER UPDATE ON cards
+        BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS cards_version_delete AFTER DELETE ON cards
+        BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END
+        ''',
+        _import_cards_json,
+    ]),
+    (9, [
+        # номер воркера, который запланировал удаление (0 — без шардинга)
+        'ALTER TABLE pending_deletions ADD COLUMN shard INTEGER NOT NULL DEFAULT 0',
+    ]),
+    (10, [
+        # перенос коллекций из старого JSON-столбца user_data.cards
+        '''
+        INSERT OR IGNORE INTO user_cards (user_id, card_id, obtained_at, count)
+        SELECT user_data.user_id, json_each.value, user_data.last_received_at, 1
+        FROM user_data, json_each(user_data.cards)
+        WHERE user_data.cards IS NOT NULL AND user_data.cards != '[]'
+        ''',
+        "UPDATE user_data SET cards = '[]' WHERE cards IS NOT NULL AND cards != '[]'",
+    ]),
+    (11, [
+        # перенос участников из старого JSON-столбца clans.members
+        '''
+        INSERT OR IGNORE INTO clan_members (clan_id, user_id)
+        SELECT clans.id, json_each.value
+        FROM clans, json_each(clans.members)
+        WHERE clans.members IS NOT NULL AND clans.members != '[]'
+        ''',
+        "UPDATE clans SET members = '[]' WHERE members IS NOT NULL AND members != '[]'",
+    ]),
+    (12, [
+        _add_card_count,
+        'CREATE INDEX IF NOT EXISTS idx_user_data_card_count ON user_data (card_count DESC)',
+    ]),
+    (13, [
+        # номер воркера, который ведёт рассылку (0 — без шардинга)
+        'ALTER TABLE broadcasts ADD COLUMN shard INTEGER NOT NULL DEFAULT 0',
+    ]),
+]
+
+
+async def get_schema_version() -> int:
+    async with pool.read() as db:
+        cursor = await db.execute('SELECT MAX(version) FROM schema_version')
+        result = await cursor.fetchone()
+        await cursor.close()
+        return result[0] or 0
+
+
+async def run_migrations():
+    async with pool.write() as db:
+        await db.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                applied_at TEXT
+            )
+        ''')
+
+    current_version = await get_schema_version()
+    for version, steps in MIGRATIONS:
+        if version <= current_version:
+            continue
+        async with pool.write() as db:
+            # при запуске нескольких воркеров миграцию мог уже применить соседний процесс
+            cursor = await db.execute('SELECT 1 FROM schema_version WHERE version = ?', (version,))
+            already_applied = await cursor.fetchone()
+            await cursor.close()
+            if already_applied:
+                continue
+            for step in steps:
+                if isinstance(step, str):
+                    await db.execute(step)
+                else:
+                    await step(db)
+            await db.execute(
+                'INSERT INTO schema_version (version, applied_at) VALUES (?, ?)',
+                (version, datetime.datetime.now().isoformat())
+            )
+        logging.info("Применена миграция базы данных %s", version)
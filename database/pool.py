@@ -0,0 +1,149 @@
+import asyncio
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, List, Optional, Tuple
+
+import aiosqlite
+
+import config
+
+
+class ConnectionPool:
+    def __init__(
+            self,
+            path: str,
+            size: int = 4,
+            batch_latency: float = 0.01,
+            batch_size: int = 200):
+        self.path = path
+        self.size = max(1, size)
+        self.batch_latency = batch_latency
+        self.batch_size = max(1, batch_size)
+        self._readers: Optional[asyncio.Queue] = None
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._write_lock = asyncio.Lock()
+        # очередь группового коммита: (операция, future с её результатом)
+        self._pending: List[Tuple[Callable[[aiosqlite.Connection], Awaitable[Any]], asyncio.Future]] = []
+        self._batch_full = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._writer is not None
+
+    async def _connect(self) -> aiosqlite.Connection:
+        db = await aiosqlite.connect(self.path)
+        # PRAGMA выполняются вне транзакции, сразу после подключения; курсоры
+        # закрываются сразу, иначе незавершённый запрос держит блокировку
+        for pragma in (
+                f'busy_timeout = {config.DB_BUSY_TIMEOUT_MS}',
+                f'synchronous = {config.DB_SYNCHRONOUS}',
+                f'cache_size = {-config.DB_CACHE_SIZE_KB}',
+                f'mmap_size = {config.DB_MMAP_SIZE}'):
+            async with db.execute(f'PRAGMA {pragma}'):
+                pass
+        return db
+
+    async def open(self):
+        if self.is_open:
+            return
+        self._writer = await self._connect()
+        # WAL сохраняется в файле базы: читатели больше не ждут писателя
+        async with self._writer.execute('PRAGMA journal_mode = WAL'):
+            pass
+        self._readers = asyncio.Queue()
+        for _ in range(self.size):
+            self._readers.put_nowait(await self._connect())
+
+    async def close(self):
+        if not self.is_open:
+            return
+        # всё, что ждёт группового коммита, записывается до закрытия
+        if self._flush_task is not None:
+            self._batch_full.set()
+            await self._flush_task
+        await self.flush()
+        async with self._write_lock:
+            for _ in range(self.size):
+                reader = await self._readers.get()
+                await reader.close()
+            await self._writer.close()
+            self._writer = None
+            self._readers = None
+
+    @asynccontextmanager
+    async def read(self):
+        reader = await self._readers.get()
+        try:
+            yield reader
+        finally:
+            self._readers.put_nowait(reader)
+
+    @asynccontextmanager
+    async def write(self):
+        async with self._write_lock:
+            # IMMEDIATE сразу берёт блокировку на запись, чтобы проверка и запись
+            # внутри одного блока не пересекались с другими процессами
+            await self._writer.execute('BEGIN IMMEDIATE')
+            try:
+                yield self._writer
+            except BaseException:
+                await self._writer.rollback()
+                raise
+            else:
+                await self._writer.commit()
+
+    async def submit(self, operation: Callable[[aiosqlite.Connection], Awaitable[Any]]) -> Any:
+        # операция выполнится в общей транзакции вместе с соседними; результат
+        # возвращается после коммита, ошибка откатывает только её саму
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((operation, future))
+        if len(self._pending) >= self.batch_size:
+            self._batch_full.set()
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_later())
+        return await future
+
+    async def _flush_later(self):
+        try:
+            await asyncio.wait_for(self._batch_full.wait(), self.batch_latency)
+        except asyncio.TimeoutError:
+            pass
+        await self.flush()
+
+    async def flush(self):
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            del self._pending[:len(batch)]
+            self._batch_full.clear()
+
+            outcomes = []
+            try:
+                async with self.write() as db:
+                    for operation, future in batch:
+                        await db.execute('SAVEPOINT submit')
+                        try:
+                            result = await operation(db)
+                        except Exception as e:
+                            await db.execute('ROLLBACK TO submit')
+                            await db.execute('RELEASE submit')
+                            outcomes.append((future, None, e))
+                        else:
+                            await db.execute('RELEASE submit')
+                            outcomes.append((future, result, None))
+            except Exception as e:
+                print(f"Ошибка группового коммита: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for future, result, error in outcomes:
+                if future.done():
+                    continue
+                if error is not None:
+                    future.set_exception(error)
+                else:
+                    future.set_result(result)
+
+
+pool = ConnectionPool(config.DB_PATH, config.DB_POOL_SIZE, config.DB_BATCH_LATENCY, config.DB_BATCH_SIZE)
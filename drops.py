@@ -0,0 +1,65 @@
+import random
+from typing import Dict, List, Tuple
+
+import config
+
+
+class DropEngine:
+    def __init__(self, rarities: Dict[str, dict]):
+        self.rarities = tuple(rarities)
+        self.points = {rarity: settings["points"] for rarity, settings in rarities.items()}
+        self.emoji = {rarity: settings.get("emoji", "") for rarity, settings in rarities.items()}
+        total_weight = sum(settings["weight"] for settings in rarities.values())
+        self.rates = {rarity: settings["weight"] / total_weight for rarity, settings in rarities.items()}
+        self._probabilities, self._aliases = self._build_alias_table([self.rates[rarity] for rarity in self.rarities])
+
+    @staticmethod
+    def _build_alias_table(rates: List[float]) -> Tuple[List[float], List[int]]:
+        # alias-метод Vose: выбор редкости за O(1) независимо от их количества
+        count = len(rates)
+        scaled = [rate * count for rate in rates]
+        probabilities = [1.0] * count
+        aliases = list(range(count))
+        small = [i for i, value in enumerate(scaled) if value < 1.0]
+        large = [i for i, value in enumerate(scaled) if value >= 1.0]
+        while small and large:
+            less, more = small.pop(), large.pop()
+            probabilities[less] = scaled[less]
+            aliases[less] = more
+            scaled[more] -= 1.0 - scaled[less]
+            if scaled[more] < 1.0:
+                small.append(more)
+            else:
+                large.append(more)
+        return probabilities, aliases
+
+    def roll(self) -> str:
+        column = random.randrange(len(self.rarities))
+        if random.random() < self._probabilities[column]:
+            return self.rarities[column]
+        return self.rarities[self._aliases[column]]
+
+    def roll_many(self, count: int) -> List[str]:
+        return [self.roll() for _ in range(count)]
+
+    def label(self, rarity: str) -> str:
+        emoji = self.emoji.get(rarity)
+        return f"{rarity} {emoji}" if emoji else rarity
+
+
+drop_engine = DropEngine(config.RARITIES)
+
+
+if __name__ == "__main__":
+    # Монте-Карло проверка шансов: python drops.py [количество бросков]
+    import sys
+    import time
+    from collections import Counter
+
+    rolls = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    started = time.perf_counter()
+    counts = Counter(drop_engine.roll_many(rolls))
+    elapsed = time.perf_counter() - started
+    print(f"{rolls} бросков за {elapsed:.2f} с")
+    for rarity in drop_engine.rarities:
+        print(f"{rarity:<12} ожидается {drop_engine.rates[rarity]:7.2%}  получено {counts[rarity] / rolls:7.2%}")
@@ -1,14 +1,17 @@
 import time
+from collections import OrderedDict
 
 from aiogram.filters import BaseFilter
 from aiogram.types import Message
 
 
 class RateLimitFilter(BaseFilter):
-    def __init__(self, limit: float, expiration_time: float = 3600):
+    def __init__(self, limit: float, expiration_time: float = 3600, max_size: int = 100_000):
         self.limit = limit
         self.expiration_time = expiration_time
-        self.last_request_time = {}
+        self.max_size = max_size
+        # порядок вставки совпадает с порядком времени запросов: самые старые записи всегда в начале
+        self.last_request_time = OrderedDict()
 
     async def __call__(self, message: Message) -> bool:
         user_id = message.from_user.id
@@ -20,12 +23,18 @@ class RateLimitFilter(BaseFilter):
             last_time = self.last_request_time[user_id]
             if (current_time - last_time) < self.limit:
                 return False
+            self.last_request_time.move_to_end(user_id)
 
         self.last_request_time[user_id] = current_time
+        if len(self.last_request_time) > self.max_size:
+            self.last_request_time.popitem(last=False)
         return True
 
     def _cleanup_expired(self, current_time: float):
-        expired_keys = [user_id for user_id, last_time in self.last_request_time.items()
-                        if (current_time - last_time) > self.expiration_time]
-        for user_id in expired_keys:
-            del self.last_request_time[user_id]
\ No newline at end of file
+        # удаляем только просроченные записи из начала, не просматривая весь словарь
+        while self.last_request_time:
+            user_id, last_time = next(iter(self.last_request_time.items()))
+            if (current_time - last_time) <= self.expiration_time:
+                break
+            del self.last_request_time[user_id]
+
@@ -1,30 +1,22 @@
-import asyncio
 import datetime
-import random
 from aiogram import Router, F
 from aiogram.filters import Command
 from aiogram.types import Message
 
-from database.cards import get_last_card_time, cards_data, add_card_and_points, has_user_card
-from database.cooldown import get_cooldown_time, get_cooldown_state
+from autodelete import deletion_scheduler
+from database.cards import claim_card
+from database.catalog import catalog
+from database.cooldown import get_chat_settings
+from drops import drop_engine
 from filters.FloodWait import RateLimitFilter
 
 cards_router = Router()
 
 COOLDOWN_SECONDS = 5400
 
-RARITY_POINTS = {
-    "Редкая": 1500,
-    "СверхРедкая": 3500,
-    "Мифическая": 5000,
-    "Легендарная": 10000,
-    "Анимка": 15000
-}
 
-
-async def auto_delete(bot, chat_id: int, user_message_id: int, bot_message_id: int):
-    delete_state = await get_cooldown_state(chat_id)
-    delete_time_minutes = await get_cooldown_time(chat_id)
+async def auto_delete(chat_id: int, user_message_id: int, bot_message_id: int):
+    delete_state, delete_time_minutes = await get_chat_settings(chat_id)
 
     if delete_state != "on":
         return
@@ -33,58 +25,43 @@ async def auto_delete(bot, chat_id: int, user_message_id: int, bot_message_id: i
     if delete_delay <= 0:
         return
 
-    await asyncio.sleep(delete_delay)
-
-    try:
-        await bot.delete_message(chat_id, user_message_id)
-        await bot.delete_message(chat_id, bot_message_id)
-    except Exception as e:
-        print(f"Ошибка при автоудалении: {e}")
+    await deletion_scheduler.schedule(chat_id, [user_message_id, bot_message_id], delete_delay)
 
 
-@cards_router.message(RateLimitFilter(2), Command("mcat"))
-@cards_router.message(RateLimitFilter(2), F.text.lower().in_({"получить карту", "мкот", "🐈 мкот"}))
+@cards_router.message(RateLimitFilter(2), Command("mcat"), flags={"throttling_key": "mcat"})
+@cards_router.message(RateLimitFilter(2), F.text.lower().in_({"получить карту", "мкот", "🐈 мкот"}),
+                      flags={"throttling_key": "mcat"})
 async def cards_handler(msg: Message):
     user_id = msg.from_user.id
     first_name = msg.from_user.first_name
     chat_id = msg.chat.id
     current_time = datetime.datetime.now()
 
-    last_time = await get_last_card_time(user_id)
-    if last_time is not None:
-        elapsed_seconds = (current_time - last_time).total_seconds()
-        if elapsed_seconds < COOLDOWN_SECONDS:
-            remaining_seconds = int(COOLDOWN_SECONDS - elapsed_seconds)
-            remaining_hours = remaining_seconds // 3600
-            remaining_minutes = (remaining_seconds % 3600) // 60
-            remaining_seconds = remaining_seconds % 60
-            await msg.reply(
-                f"<i>Вы уже получали карточку недавно.</i> Пожалуйста, подождите ещё:\n\n"
-                f"<b>{remaining_hours} ч {remaining_minutes} мин {remaining_seconds} сек</b> ⏳",
-                parse_mode='HTML'
-            )
-            return
-
-    random_number = random.randint(1, 100)
-    if 1 <= random_number <= 5:
-        rarity = "Анимка 🎥"
-    elif 6 <= random_number <= 15:
-        rarity = "Легендарная 🌟"
-    elif 16 <= random_number <= 30:
-        rarity = "Мифическая ✨"
-    elif 31 <= random_number <= 50:
-        rarity = "СверхРедкая 💎"
-    else:
-        rarity = "Редкая ⭐️"
+    def roll_card():
+        card_rarity = drop_engine.roll()
+        return card_rarity, catalog.random_card(card_rarity), drop_engine.points[card_rarity]
+
+    claim = await claim_card(user_id, first_name, current_time, COOLDOWN_SECONDS, roll_card)
+    if claim["status"] == "cooldown":
+        remaining_seconds = claim["remaining"]
+        remaining_hours = remaining_seconds // 3600
+        remaining_minutes = (remaining_seconds % 3600) // 60
+        remaining_seconds = remaining_seconds % 60
+        await msg.reply(
+            f"<i>Вы уже получали карточку недавно.</i> Пожалуйста, подождите ещё:\n\n"
+            f"<b>{remaining_hours} ч {remaining_minutes} мин {remaining_seconds} сек</b> ⏳",
+            parse_mode='HTML'
+        )
+        return
 
-    clean_rarity = rarity.split(" ")[0]
-    eligible_cards = [card for card in cards_data["cards"] if card["rarity"] == clean_rarity]
-    if not eligible_cards:
+    clean_rarity = claim["rarity"]
+    rarity = drop_engine.label(clean_rarity)
+    if claim["status"] == "empty":
         await msg.answer(f"<i>К сожалению, нет карточек с редкостью</i> <b>{rarity}</b>.", parse_mode='HTML')
         return
 
-    selected_card = random.choice(eligible_cards)
-    points = RARITY_POINTS[clean_rarity]
+    selected_card = claim["card"]
+    points = claim["points"]
 
     if clean_rarity == "Анимка":
         send_method = msg.answer_animation
@@ -93,7 +70,7 @@ async def cards_handler(msg: Message):
         send_method = msg.answer_photo
         media_arg = {"photo": selected_card["file_id"]}
 
-    if await has_user_card(user_id, selected_card["id"]):
+    if claim["status"] == "duplicate":
         bot_message = await send_method(
             **media_arg,
             caption=(
@@ -120,5 +97,4 @@ async def cards_handler(msg: Message):
             reply_to_message_id=msg.message_id
         )
 
-    await add_card_and_points(user_id, first_name, selected_card["id"], current_time, points)
-    await auto_delete(msg.bot, chat_id, msg.message_id, bot_message.message_id)
\ No newline at end of file
+    await auto_delete(chat_id, msg.message_id, bot_message.message_id)
\ No newline at end of file
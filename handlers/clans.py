@@ -330,7 +330,7 @@ async def notify_clan_creator(bot: Bot, creator_id: int, user_id: int, clan_name
     if user_profile:
         now_points = user_profile['now_points']
         all_points = user_profile['all_points']
-        cards_count = len(user_profile['cards'])
+        cards_count = user_profile['card_count']
     else:
         now_points = 0
         all_points = 0
@@ -3,21 +3,15 @@ from aiogram.filters import Command
 from aiogram.types import Message, CallbackQuery, InputMediaPhoto, InputMediaAnimation
 from aiogram.utils.text_decorations import html_decoration
 
-from database.cards import get_user_profile_data, cards_data, get_top_users_by_now_points, get_top_users_by_cards, \
-    get_top_users_by_all_points
+from database.cards import get_user_profile_data, get_top_users_by_now_points, get_top_users_by_cards, \
+    get_top_users_by_all_points, get_collection_card
 from database.clans import get_top_clans_by_points
+from database.leaderboard import leaderboard
+from drops import drop_engine
 from kb import profile_kb, rarity_kb, cards_keyboard, top_kb, top_back_kb
 
 profile_router = Router()
 
-RARITY_POINTS = {
-    "Редкая": 1500,
-    "СверхРедкая": 3500,
-    "Мифическая": 5000,
-    "Легендарная": 10000,
-    "Анимка": 15000
-}
-
 
 @profile_router.message(Command("profile"))
 @profile_router.message(F.text.lower().in_({"мпрофиль", "👥️ профиль"}))
@@ -27,10 +21,9 @@ async def profile(msg: Message):
     if not user_data:
         await msg.answer("❌ Профиль не найден. Похоже, вы ещё не получили карточек.")
         return
-    cards = user_data["cards"]
+    card_count = user_data["card_count"]
     now_points = user_data["now_points"]
     all_points = user_data["all_points"]
-    card_count = len(cards)
     profile_text = (
         f"🎴 <b>Ваш профиль</b> 🎴\n\n"
         f"👤 <b>Имя:</b> {html_decoration.bold(html_decoration.quote(msg.from_user.first_name))}\n"
@@ -42,7 +35,7 @@ async def profile(msg: Message):
     await msg.reply(profile_text, parse_mode="HTML", reply_markup=await profile_kb(user_id))
 
 
-@profile_router.callback_query(F.data.startswith("top:"))
+@profile_router.callback_query(F.data.startswith("top:"), flags={"throttling_key": "top"})
 async def top_cards(callback: CallbackQuery):
     user_id = callback.from_user.id
     if callback.data.split(":")[1] != str(user_id):
@@ -55,7 +48,7 @@ async def top_cards(callback: CallbackQuery):
     )
 
 
-@profile_router.callback_query(F.data.startswith("top_"))
+@profile_router.callback_query(F.data.startswith("top_"), flags={"throttling_key": "top"})
 async def show_top(callback: CallbackQuery):
     data = callback.data.split(":")
     top_data = data[0]
@@ -65,22 +58,22 @@ async def show_top(callback: CallbackQuery):
         return
     top_type = top_data.split("_")[1]
     if top_type == "points":
-        top_users = await get_top_users_by_now_points()
+        top_users = await leaderboard.get("points", get_top_users_by_now_points)
         text = "🏆 Топ 10 игроков по текущим очкам:\n\n"
         for i, (user_id, first_name, now_points) in enumerate(top_users, start=1):
             text += f"<blockquote> {i}. {html_decoration.bold(html_decoration.quote(first_name))} - {now_points} очков </blockquote>\n"
     elif top_type == "cards":
-        top_users = await get_top_users_by_cards()
+        top_users = await leaderboard.get("cards", get_top_users_by_cards)
         text = "🏆 Топ 10 игроков по количеству карточек:\n\n"
         for i, (user_id, first_name, card_count) in enumerate(top_users, start=1):
             text += f"<blockquote> {i}. {html_decoration.bold(html_decoration.quote(first_name))}- {card_count} карточек </blockquote>\n"
     elif top_type == "all":
-        top_users = await get_top_users_by_all_points()
+        top_users = await leaderboard.get("all", get_top_users_by_all_points)
         text = "🏆 Топ 10 игроков по очкам за все сезоны:\n\n"
         for i, (user_id, first_name, all_points) in enumerate(top_users, start=1):
             text += f"<blockquote> {i}. {html_decoration.bold(html_decoration.quote(first_name))} - {all_points} очков </blockquote>\n"
     elif top_type == "clans":
-        top_clans = await get_top_clans_by_points()
+        top_clans = await leaderboard.get("clans", get_top_clans_by_points)
         text = "🏆 <b>Топ 10 кланов по суммарным очкам:</b>\n\n"
         for i, (clan_name, member_count, total_points) in enumerate(top_clans, start=1):
             text += f"{i}. 🏰 {html_decoration.bold(html_decoration.quote(clan_name))} — {total_points} очков ({member_count} участников)\n"
@@ -127,22 +120,12 @@ async def show_cards(callback: CallbackQuery):
 @profile_router.callback_query(F.data.startswith("select_rarity:"))
 async def select_rarity(callback: CallbackQuery):
     rarity = callback.data.split(":")[1]
-    user_data = await get_user_profile_data(callback.from_user.id)
-    if user_data is None:
-        await callback.message.answer("Данные профиля не найдены.")
-        await callback.answer()
-        return
-    user_cards = user_data['cards']
-    user_cards_data = [card for card in cards_data['cards'] if card['id'] in user_cards]
-    rarity_cards = [card for card in user_cards_data if card['rarity'] == rarity]
-    if not rarity_cards:
+    card, index, total_cards = await get_collection_card(callback.from_user.id, rarity, 0)
+    if card is None:
         await callback.answer("❌ У вас нет карточек этой редкости.")
         return
-    index = 0
-    card = rarity_cards[index]
-    points = RARITY_POINTS.get(card['rarity'], 0)
+    points = drop_engine.points.get(card['rarity'], 0)
     caption = f"🃏 Карточка: {card['name']}\n🎴 Раритет: {card['rarity']}\n💯 Очки: {points}"
-    total_cards = len(rarity_cards)
     keyboard = await cards_keyboard(rarity, index, total_cards)
 
     if card['rarity'] == "Анимка":
@@ -152,23 +135,16 @@ async def select_rarity(callback: CallbackQuery):
     await callback.answer()
 
 
-@profile_router.callback_query(F.data.startswith("view_card:"))
+@profile_router.callback_query(F.data.startswith("view_card:"), flags={"throttling_key": "view_card"})
 async def view_card(callback: CallbackQuery):
     data = callback.data.split(":")
     rarity = data[1]
-    index = int(data[2])
-    user_data = await get_user_profile_data(callback.from_user.id)
-    if user_data is None:
-        await callback.message.answer("Данные профиля не найдены.")
-        await callback.answer()
+    card, index, total_cards = await get_collection_card(callback.from_user.id, rarity, int(data[2]))
+    if card is None:
+        await callback.answer("❌ Карточка не найдена.")
         return
-    user_cards = user_data['cards']
-    user_cards_data = [card for card in cards_data['cards'] if card['id'] in user_cards]
-    rarity_cards = [card for card in user_cards_data if card['rarity'] == rarity]
-    total_cards = len(rarity_cards)
 
-    card = rarity_cards[index]
-    points = RARITY_POINTS.get(card['rarity'], 0)
+    points = drop_engine.points.get(card['rarity'], 0)
     caption = f"🃏 Карточка: {card['name']}\n🎴 Раритет: {card['rarity']}\n💯 Очки: {points}"
     keyboard = await cards_keyboard(rarity, index, total_cards)
 
@@ -2,33 +2,62 @@ import asyncio
 import logging
 
 from aiogram import Bot, Dispatcher
-from aiogram.fsm.storage.memory import MemoryStorage
 
 import config
 from admin.add_cards import admin_router
+from autodelete import deletion_scheduler
+from backup import backup_scheduler
+from broadcast import broadcaster
 from database.cards import init_db
+from database.catalog import catalog
 from database.clans import initialize_database
 from database.cooldown import init_cd_db
-from database.mailing import create_table
+from database.fsm_storage import SQLiteStorage
+from database.migrations import run_migrations
+from database.pool import pool
 from handlers.cards import cards_router
 from handlers.clans import clans_router
 from handlers.handlers import router
 from handlers.profile import profile_router
-from middlewares.throttling_middlewares import ThrottlingMiddleware
+from middlewares.throttling_middlewares import throttling
+from webhook import run_webhook
 
 
 async def main():
-    await create_table()
-    await init_db()
-    await init_cd_db()
-    await initialize_database()
-    bot = Bot(token=config.BOT_TOKEN)
-    dp = Dispatcher(storage=MemoryStorage())
-    dp.message.middleware(ThrottlingMiddleware())
-    dp.include_routers(router, cards_router, admin_router,
-                       profile_router, clans_router)
-    await bot.delete_webhook(drop_pending_updates=True)
-    await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    await pool.open()
+    try:
+        await init_db()
+        await init_cd_db()
+        await initialize_database()
+        await run_migrations()
+        await catalog.load()
+        await catalog.start()
+        bot = Bot(token=config.BOT_TOKEN)
+        storage = SQLiteStorage(flush_interval=config.FSM_FLUSH_INTERVAL, state_ttl=config.FSM_STATE_TTL)
+        dp = Dispatcher(storage=storage)
+        dp.message.middleware(throttling)
+        dp.callback_query.middleware(throttling)
+        dp.include_routers(router, cards_router, admin_router,
+                           profile_router, clans_router)
+        await deletion_scheduler.start(bot, config.SHARD_INDEX, config.WORKERS)
+        await broadcaster.resume(bot, config.SHARD_INDEX, config.WORKERS)
+        # резервные копии по расписанию делает только один воркер
+        if config.SHARD_INDEX in (None, 0):
+            await backup_scheduler.start()
+        if config.SHARD_INDEX is not None:
+            # воркер за sharding.py: вебхук регистрирует роутер
+            await run_webhook(dp, bot, host="127.0.0.1", port=config.WORKER_BASE_PORT + config.SHARD_INDEX, public_url="")
+        elif config.WEBHOOK_ENABLED:
+            await run_webhook(dp, bot)
+        else:
+            await bot.delete_webhook(drop_pending_updates=True)
+            await dp.start_polling(bot, allowed_updates=dp.resolve_used_update_types())
+    finally:
+        await backup_scheduler.stop()
+        await catalog.stop()
+        await broadcaster.stop()
+        await deletion_scheduler.stop()
+        await pool.close()
 
 
 if __name__ == "__main__":
@@ -1,21 +1,83 @@
-from typing import Any, Awaitable, Callable, Dict
+import time
+from collections import Counter, OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple, Union
 
 from aiogram import BaseMiddleware
-from aiogram.types import Message
-from cachetools import TTLCache
+from aiogram.dispatcher.flags import get_flag
+from aiogram.types import CallbackQuery, Message
+
+import config
 
 
 class ThrottlingMiddleware(BaseMiddleware):
-    def __init__(self):
-        self.cache = TTLCache(maxsize=10_000, ttl=1)
+    def __init__(
+            self,
+            key: str = "user",
+            default_rate: Tuple[float, float] = (1.0, 1),
+            rates: Optional[Dict[str, Tuple[float, float]]] = None,
+            max_keys: int = 10_000):
+        if key not in ("user", "chat", "user_chat"):
+            raise ValueError(f"Неизвестный ключ антифлуда: {key}")
+        self.key = key
+        self.default_rate = default_rate
+        self.rates = rates or {}
+        self.max_keys = max_keys
+        # ключ -> (токены, время последнего пополнения); старые ключи вытесняются первыми
+        self.buckets: "OrderedDict[tuple, Tuple[float, float]]" = OrderedDict()
+        self.passed = 0
+        self.dropped = Counter()
+
+    def _get_key(self, event: Union[Message, CallbackQuery]) -> Optional[tuple]:
+        user_id = event.from_user.id if event.from_user else None
+        if isinstance(event, CallbackQuery):
+            chat_id = event.message.chat.id if event.message else None
+        else:
+            chat_id = event.chat.id
+        if self.key == "user":
+            return (user_id,) if user_id is not None else None
+        if self.key == "chat":
+            return (chat_id,) if chat_id is not None else None
+        return user_id, chat_id
+
+    def _allow(self, key: tuple, command: str) -> bool:
+        rate, burst = self.rates.get(command, self.default_rate)
+        bucket_key = key + (command if command in self.rates else "",)
+        now = time.monotonic()
+        tokens, updated_at = self.buckets.pop(bucket_key, (burst, now))
+        tokens = min(burst, tokens + (now - updated_at) * rate)
+        allowed = tokens >= 1
+        if allowed:
+            tokens -= 1
+        self.buckets[bucket_key] = (tokens, now)
+        if len(self.buckets) > self.max_keys:
+            self.buckets.popitem(last=False)
+        return allowed
 
     async def __call__(
             self,
-            handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
-            event: Message,
+            handler: Callable[[Union[Message, CallbackQuery], Dict[str, Any]], Awaitable[Any]],
+            event: Union[Message, CallbackQuery],
             data: Dict[str, Any]):
-        if event.from_user.id in self.cache:
-            return
-        else:
-            self.cache[event.chat.id] = None
-        return await handler(event, data)
\ No newline at end of file
+        key = self._get_key(event)
+        if key is not None:
+            # ключ лимита задаёт сам обработчик: flags={"throttling_key": "mcat"}
+            command = get_flag(data, "throttling_key", default="")
+            if not self._allow(key, command):
+                self.dropped[command or "other"] += 1
+                if isinstance(event, CallbackQuery):
+                    # без ответа кнопка у пользователя крутится до таймаута Telegram
+                    try:
+                        await event.answer("⏳ Слишком быстро, подождите немного.")
+                    except Exception as e:
+                        print(f"Не удалось ответить на нажатие кнопки: {e}")
+                return
+        self.passed += 1
+        return await handler(event, data)
+
+
+throttling = ThrottlingMiddleware(
+    key=config.THROTTLE_KEY,
+    default_rate=config.THROTTLE_DEFAULT_RATE,
+    rates=config.THROTTLE_RATES,
+    max_keys=config.THROTTLE_MAX_KEYS
+)
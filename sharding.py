@@ -0,0 +1,151 @@
+import asyncio
+import json
+import logging
+import os
+import signal
+import sys
+from typing import Dict
+
+import aiohttp
+from aiogram import Bot
+from aiohttp import web
+
+import config
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+MAIN_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "main.py")
+
+
+# Как устроено:
+# sharding.py принимает вебхук Telegram и пересылает каждый апдейт одному из
+# WORKERS процессов main.py (SHARD_INDEX в окружении) по id пользователя, а если
+# его нет — по id чата. Все апдейты одного пользователя попадают в один воркер,
+# поэтому его антифлуд, буфер FSM и порядок обработки остаются как в одном процессе.
+#
+# Общее состояние:
+# - FSM, кулдауны карточек, очки, кланы и отложенные удаления лежат в SQLite
+#   и общие для всех воркеров; кулдаун выдаётся внутри транзакции записи;
+# - кэши топов (LEADERBOARD_TTL) и настроек чатов (CHAT_SETTINGS_CACHE_TTL)
+#   у каждого процесса свои и догоняют базу по истечении TTL;
+# - каталог карточек — снимок в памяти каждого процесса, перечитывается,
+#   когда меняется catalog_version (проверка раз в CATALOG_POLL_INTERVAL);
+# - отложенное удаление и рассылка помечены номером воркера, который их начал,
+#   и после перезапуска воркер поднимает только свои;
+# - лимит рассылок BROADCAST_RATE делится поровну между воркерами: у каждого
+#   процесса свой TokenBucket, а лимит Telegram общий для бота;
+# - резервные копии по расписанию делает только воркер 0.
+
+def shard_key(update: dict) -> int:
+    for field, payload in update.items():
+        if field == "update_id" or not isinstance(payload, dict):
+            continue
+        user = payload.get("from") or payload.get("user")
+        if user:
+            return user["id"]
+        chat = payload.get("chat") or (payload.get("message") or {}).get("chat")
+        if chat:
+            return chat["id"]
+    return 0
+
+
+def worker_url(index: int) -> str:
+    return f"http://127.0.0.1:{config.WORKER_BASE_PORT + index}{config.WEBHOOK_PATH}"
+
+
+async def supervise(index: int, processes: Dict[int, asyncio.subprocess.Process], stopping: asyncio.Event):
+    while not stopping.is_set():
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, MAIN_PATH,
+            env={**os.environ, "SHARD_INDEX": str(index)},
+            # своя группа процессов: Ctrl+C получает только супервизор и
+            # останавливает воркеры сам, после того как роутер дождётся апдейтов
+            start_new_session=True
+        )
+        processes[index] = process
+        await process.wait()
+        if not stopping.is_set():
+            print(f"Воркер {index} завершился с кодом {process.returncode}, перезапускаем")
+            await asyncio.sleep(1)
+
+
+def create_router(session: aiohttp.ClientSession, workers: int) -> web.Application:
+    headers = {"Content-Type": "application/json", SECRET_HEADER: config.WEBHOOK_SECRET}
+
+    async def handle(request: web.Request) -> web.Response:
+        if request.headers.get(SECRET_HEADER) != config.WEBHOOK_SECRET:
+            return web.Response(status=401)
+        body = await request.read()
+        try:
+            index = abs(shard_key(json.loads(body))) % workers
+        except (ValueError, AttributeError):
+            return web.Response(status=400)
+
+        # ждём ответа воркера: он приходит после обработчика, так что Telegram
+        # не получит 200 за необработанный апдейт
+        try:
+            async with session.post(worker_url(index), data=body, headers=headers) as response:
+                return web.Response(
+                    status=response.status,
+                    body=await response.read(),
+                    headers={"Content-Type": response.headers.get("Content-Type", "application/json")}
+                )
+        except aiohttp.ClientError as e:
+            # воркер перезапускается — Telegram повторит апдейт позже
+            print(f"Воркер {index} недоступен: {e}")
+            return web.Response(status=502)
+
+    app = web.Application()
+    app.router.add_post(config.WEBHOOK_PATH, handle)
+    return app
+
+
+async def main():
+    # без секрета роутер принял бы апдейты от кого угодно
+    if not config.WEBHOOK_SECRET:
+        raise RuntimeError("Для запуска нескольких воркеров нужно задать WEBHOOK_SECRET в config.py")
+
+    stopping = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stopping.set)
+        except NotImplementedError:
+            pass
+
+    processes: Dict[int, asyncio.subprocess.Process] = {}
+    supervisors = [
+        asyncio.create_task(supervise(index, processes, stopping))
+        for index in range(config.WORKERS)
+    ]
+
+    session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None))
+    runner = web.AppRunner(create_router(session, config.WORKERS), shutdown_timeout=config.WEBHOOK_DRAIN_TIMEOUT)
+    await runner.setup()
+    try:
+        await web.TCPSite(runner, config.WEBHOOK_HOST, config.WEBHOOK_PORT).start()
+        if config.WEBHOOK_URL:
+            bot = Bot(token=config.BOT_TOKEN)
+            try:
+                await bot.set_webhook(
+                    url=config.WEBHOOK_URL.rstrip("/") + config.WEBHOOK_PATH,
+                    secret_token=config.WEBHOOK_SECRET,
+                    drop_pending_updates=True
+                )
+            finally:
+                await bot.session.close()
+        print(f"Роутер слушает {config.WEBHOOK_HOST}:{config.WEBHOOK_PORT}, воркеров: {config.WORKERS}")
+        await stopping.wait()
+    finally:
+        stopping.set()
+        # сначала дожидаемся пересланных апдейтов, потом останавливаем воркеры
+        await runner.cleanup()
+        for process in processes.values():
+            if process.returncode is None:
+                process.send_signal(signal.SIGTERM)
+        await asyncio.gather(*supervisors)
+        await session.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -0,0 +1,68 @@
+import asyncio
+import signal
+
+from aiogram import Bot, Dispatcher
+from aiogram.webhook.aiohttp_server import SimpleRequestHandler
+from aiohttp import web
+
+import config
+
+
+async def run_webhook(
+        dp: Dispatcher,
+        bot: Bot,
+        host: str = config.WEBHOOK_HOST,
+        port: int = config.WEBHOOK_PORT,
+        public_url: str = config.WEBHOOK_URL):
+    # без секрета сервер принял бы апдейты от кого угодно
+    if not config.WEBHOOK_SECRET:
+        raise RuntimeError("Для режима вебхука нужно задать WEBHOOK_SECRET в config.py")
+
+    app = web.Application()
+    # handle_in_background=False: ответ Telegram уходит только после обработчика,
+    # поэтому остановка сервера дожидается всех начатых апдейтов
+    SimpleRequestHandler(
+        dispatcher=dp,
+        bot=bot,
+        handle_in_background=False,
+        secret_token=config.WEBHOOK_SECRET
+    ).register(app, path=config.WEBHOOK_PATH)
+
+    runner = web.AppRunner(app, shutdown_timeout=config.WEBHOOK_DRAIN_TIMEOUT)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            pass
+
+    # startup/shutdown диспетчера вызываются вручную, а не через on_shutdown
+    # приложения: aiohttp вызывает его до того, как дождётся запросов,
+    # и хранилище FSM закрылось бы под работающими обработчиками
+    workflow_data = {"dispatcher": dp, "bots": [bot], **dp.workflow_data}
+    await dp.emit_startup(bot=bot, **workflow_data)
+    try:
+        await site.start()
+        if public_url:
+            await bot.set_webhook(
+                url=public_url.rstrip("/") + config.WEBHOOK_PATH,
+                secret_token=config.WEBHOOK_SECRET,
+                allowed_updates=dp.resolve_used_update_types(),
+                drop_pending_updates=True
+            )
+        print(f"Вебхук слушает {host}:{port}{config.WEBHOOK_PATH}")
+        await stop.wait()
+    finally:
+        await runner.cleanup()
+        await dp.emit_shutdown(bot=bot, **workflow_data)
+        # как close_bot_session=True в start_polling
+        await bot.session.close()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.remove_signal_handler(sig)
+            except NotImplementedError:
+                pass